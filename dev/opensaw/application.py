@@ -27,7 +27,7 @@ from time import sleep
 
 # Local
 # Keep local imports relative.
-from opensaw import bap, configure, pin, working
+from opensaw import bap, concolic, configure, pin, working
 from opensaw.utils.funs import abort, yesNoQuery
 
 from opensaw.utils.threads import WorkThread
@@ -66,6 +66,9 @@ def main(arguments):
 
     # Prepare to measure the performance of `STP` and `BAP`.
     configure.performance_measurements(work)
+    configure.flow_control(work, options)
+    # The engine may fork worker processes, so it is started before any threads.
+    configure.concolic_engine(options)
 
     active_threads = []
 
@@ -94,8 +97,9 @@ def main(arguments):
         for thread in active_threads:
             thread.start()
 
-        while not work.is_done():
-            sleep(1)
+        # Waiting in intervals, since a wait without timeout cannot be interrupted.
+        while not work.wait_done(1):
+            pass
 
         logging.info("OpenSAW run complete")
         work.statistics.complete()
@@ -113,6 +117,8 @@ def main(arguments):
         for thread in active_threads:
             thread.join()
 
+        concolic.stopEngine()
+
     logging.debug("Saving progress")
     # Save current state (if required)
     if not work.queues_empty() and not work.forced_done and yesNoQuery("Do you want to save the progress?"):
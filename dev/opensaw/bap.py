@@ -21,7 +21,6 @@
 from __future__ import absolute_import
 
 import logging
-import shutil
 from os.path import basename
 from os import remove
 
@@ -32,15 +31,14 @@ except ImportError:
     import Queue as queue
 
 from threading import current_thread
+from time import time
 import traceback
 import sys
-from time import sleep
 
 from opensaw.concolic import ConcolicEngine
 from opensaw.utils.jobs import InputJob
 from opensaw.utils import threads
-
-input_file_formatter = "generated-{}.in".format
+from opensaw.working import inputs
 
 
 class Worker(object):
@@ -69,13 +67,21 @@ class Worker(object):
         self.thread = current_thread()
         logging.debug("Running BAP in thread: {}".format(self.thread.getName()))
 
+        # Wakes `handle_trace_job` if it is waiting for a batch when stopped.
+        self.thread.add_stop_callback(self.bpool.stop)
+
         # Main loop
         while not self.thread.is_stopped():
-            trace_job = self.thread.get()
+            # Waits for a job, or returns None when the thread is stopped.
+            start = time()
+            trace_job = self.thread.get(block=True)
 
             if trace_job is None:
-                sleep(1)
                 continue
+
+            # The trace is out of the queue, another one may be traced.
+            self.work.trace_credits.release()
+            self.work.statistics.stage("bap").report_job(self.work.trace_queue.qsize(), time() - start)
             self.handle_trace_job(trace_job)
 
         # All tasks in the bpool should have finished as the pool was joined.
@@ -88,7 +94,7 @@ class Worker(object):
         Handles a single trace job.
         """
         branchPoolname = "BAP-pool-branches-%s"%trace_job.file_name;
-        self.bpool.addQueue(branchPoolname,Worker.analyze_edge_node_pair,self.options.bapPool)
+        batch = self.bpool.addQueue(branchPoolname,Worker.analyze_edge_node_pair,self.options.bapPool)
 
         logging.debug("Got trace task: {}."
                       .format(trace_job.file_name))
@@ -100,15 +106,18 @@ class Worker(object):
         #Still need to work in the path that we are working in
         #Added to be able to run in ramdisk without having to store resting traces in ramdisk
         if trace_job.file_name != basename(trace_job.file_name):
-            shutil.move(trace_job.file_name,basename(trace_job.file_name))
+            ConcolicEngine.moveTrace(trace_job.file_name,basename(trace_job.file_name))
             trace_job.file_name = basename(trace_job.file_name)
 
 
         raw_trace = ConcolicEngine(trace_job.file_name, trace_job.input_name)
 
-        # For small traces one can store visited nodes in memory while they are in the Queue.
-        # For larger we simply recalculate the visited nodes
-        # Use flag --reanalyzeTrace to enable recalculation.
+        # The trace is removed as soon as the last branch has been analyzed.
+        batch.add_done_callback(lambda _: self.finish_trace_job(branchPoolname, raw_trace, trace_job))
+
+        # The visited nodes are recalculated from the .ilx index of the trace,
+        # rather than kept in memory while the trace is queued. Jobs saved
+        # before may still carry them.
         if "tracegraph:trace" in trace_job:
             trace = trace_job["tracegraph:trace"]
         else:
@@ -182,10 +191,14 @@ class Worker(object):
                 traceback.print_exc(file=sys.stdout)
                 logging.error("Failed to look for unsafe stack write in %s due to %s" % (trace_job.input_name, repr(e)))
 
-        while not self.should_abort() and not self.bpool.queueDone(branchPoolname):
-            # TODO: Change from polling behaviour
-            sleep(1)
+        # Returns when stopped, even if branches are still being analyzed.
+        batch.close()
+        batch.wait()
 
+    def finish_trace_job(self, branchPoolname, raw_trace, trace_job):
+        """
+        Removes the trace of a trace job whose branches have all been analyzed.
+        """
         self.bpool.delQueue(branchPoolname)
 
         remove(trace_job.file_name)
@@ -255,23 +268,12 @@ class Worker(object):
         """
         Creates a new input job from the given input.
         """
-        input_hash = hash(new_input)
-        input_db = self.work.input_db
-
-        # If the input_hash already exists in the input database,
+        # If an input with the same contents has already been stored,
         # it has already been taken care of. Ignore this duplicate
         # and return `None`.
-        with self.work.input_db_lock:
-            if input_hash in input_db:
-                return None
-
-            input_db.add(input_hash)
-
-        # Create a new InputJob with a `file_name` property,
-        # formatted according to `input_file_formatter`.
-        input_job = InputJob(input_file_formatter,path=self.options.inputStorage)
-
-        with open(input_job.file_name, "wb") as new_input_file:
-            new_input_file.write(new_input)
+        key = self.work.inputs.add(new_input, self.options.inputStorage)
+        if key is None:
+            return None
 
-        return input_job
\ No newline at end of file
+        # The input was written to a file named by its digest.
+        return InputJob(lambda _: inputs.file_name(key),path=self.options.inputStorage)
\ No newline at end of file
@@ -16,4 +16,5 @@
     51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 from pinbap.pinbap import PinBap as ConcolicEngine
-from pinbap.pinbap import setPerformanceMeasurer
\ No newline at end of file
+from pinbap.pinbap import setPerformanceMeasurer
+from pinbap.pinbap import startEngine, stopEngine
\ No newline at end of file
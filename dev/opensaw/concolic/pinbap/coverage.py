@@ -0,0 +1,84 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+Readers of the coverage files written by `gentrace.so`.
+
+The text format is a comma separated list of `address:visit` entries,
+see `docs/coverage.md`. With `-coverage-format binary` the pintool
+writes little-endian `uint32` address and visit pairs instead, which
+are read without parsing, directly into `numpy` arrays if available.
+
+Both readers return the addresses and the visit enums as sequences
+of the same length.
+"""
+import sys
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TEXT = "text"
+BINARY = "binary"
+
+
+def read_text_coverage(cov_file):
+    """
+    Reads a text coverage file.
+    """
+    addresses = array('L')
+    visits = array('B')
+
+    with open(cov_file) as f:
+        for entry in f.read().split(","):
+            if ":" not in entry:
+                continue
+            address, visit = entry.split(":")
+            addresses.append(int(address))
+            visits.append(int(visit))
+
+    return addresses, visits
+
+
+def read_binary_coverage(cov_file):
+    """
+    Reads a binary coverage file.
+    """
+    if numpy is not None:
+        pairs = numpy.fromfile(cov_file, dtype="<u4")
+        pairs = pairs[:len(pairs) - len(pairs) % 2].reshape(-1, 2)
+        return pairs[:, 0], pairs[:, 1].astype(numpy.uint8)
+
+    pairs = array('I')
+    with open(cov_file, "rb") as f:
+        data = f.read()
+    pairs.fromstring(data[:len(data) - len(data) % (2 * pairs.itemsize)])
+    if sys.byteorder != "little":
+        pairs.byteswap()
+
+    return pairs[0::2], array('B', pairs[1::2])
+
+
+def as_list(values):
+    """
+    Returns a list of the `int`s in an `array`, a `numpy` array or a list.
+    """
+    if hasattr(values, "tolist"):
+        return values.tolist()
+    return list(values)
@@ -0,0 +1,42 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import struct
+
+from opensaw.concolic.pinbap.coverage import as_list, read_binary_coverage, read_text_coverage
+
+
+def test_read_coverage(tmpdir):
+    entries = [(984, 3), (1004, 5), (1006, 0), (1025, 7)]
+
+    text = tmpdir.join("visited.cov")
+    text.write(",".join("%d:%d" % entry for entry in entries))
+
+    binary = tmpdir.join("visited.bcov")
+    binary.write(b"".join(struct.pack("<II", *entry) for entry in entries), mode="wb")
+
+    for addresses, paths in [read_text_coverage(text.strpath), read_binary_coverage(binary.strpath)]:
+        assert list(zip(as_list(addresses), as_list(paths))) == entries
+
+
+def test_read_empty_coverage(tmpdir):
+    tmpdir.join("empty.cov").write("")
+    tmpdir.join("empty.bcov").write("")
+
+    for addresses, paths in [read_text_coverage(tmpdir.join("empty.cov").strpath),
+                             read_binary_coverage(tmpdir.join("empty.bcov").strpath)]:
+        assert as_list(addresses) == [] and as_list(paths) == []
@@ -15,7 +15,13 @@
     with this program; if not, write to the Free Software Foundation, Inc.,
     51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
+from collections import deque
+
 from .jumps import *
+from .libraries import LibraryIndex
+from .index import FAULT_WINDOW, MappedBlocks, TraceIndex, fault_of_lines, index_file, index_stream, index_trace
+from .parsepool import ParsePool
+from .sidecar import read_sidecar, sidecar_of, write_sidecar
 
 
 def find_fault_in_file(il_file):
@@ -24,26 +30,5 @@ def find_fault_in_file(il_file):
     of an `.il` file. Returns the number of the signal
     that terminated the process, otherwise `None`.
     """
-    prefix = "special \"Exception number "
-
-    # We don't know the number of lines, so can't take last 5 directly
-    lastlines = {}
-    for idx, line in enumerate(iterate_lines(il_file)):
-        lastlines[idx % 5] = line
-
-    # Look at the last five lines
-    for line in lastlines.values():
-        if not line.startswith(prefix):
-            continue
-
-        # Slice away prefix
-        interest = line[len(prefix):]
-
-        # Get numbers
-        i = 0
-        while interest[i] in "0123456789":
-            i += 1
-
-        # Return signal number
-        return int(interest[:i])
-    return None
+    # We don't know the number of lines, so can't take last lines directly
+    return fault_of_lines(deque(iterate_lines(il_file), maxlen=FAULT_WINDOW))
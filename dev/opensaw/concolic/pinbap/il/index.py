@@ -0,0 +1,383 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+A single pass indexer of `.il` traces.
+
+Reading a trace with `parse_libraries`, `find_all_jumps` and
+`find_fault_in_file` separately means reading the file once for
+every piece of information. The `TraceIndex` collects all of it
+while the lines are read once:
+
+- the loaded libraries,
+- the blocks ending in conditional jumps, and the altered jumps,
+- the normalized BBL hashes and instruction counts of the blocks,
+- the signal that terminated the traced process.
+"""
+import logging
+import mmap
+from array import array
+from collections import deque
+
+from opensaw.concolic.pinbap.il.x86.cjumps import cjumps
+from opensaw.concolic.pinbap.il.libraries import LibraryIndex
+from opensaw.concolic.pinbap.il.jumps import (
+    JumpState,
+    SPECIAL_MODULE,
+    adler32_hash,
+    iterate_lines,
+    libraries_parseline
+)
+
+FAULT_PREFIX = "special \"Exception number "
+LABEL_PREFIX = "label pc_"
+
+# Number of lines at the end of the trace searched for a fault.
+FAULT_WINDOW = 5
+
+# Bytes of a mapped trace copied at once by `MappedBlocks.write_code`.
+CHUNK = 1 << 20
+
+
+class TraceIndex(object):
+    """
+    TraceIndex
+    ==========
+
+    The result of indexing an `.il` trace. The code of the blocks
+    is not kept, only the byte offsets where the blocks start.
+    Use `load_blocks` or `map_blocks` to access the code.
+
+    #### Attributes
+        libs : LibraryIndex
+            The loaded libraries mapped to their low and high addresses.
+        boundaries : array('L')
+            The byte offset of the conditional jump ending each block
+            but the last. Block `k + 1` starts at `boundaries[k]`.
+        size : int
+            The number of bytes in the trace, counting a newline
+            after the last line.
+        flags : array('L')
+            The `EFLAGS` context of the jump ending each block but the last.
+        ecx : array('L')
+            The `R_ECX` context of the jump ending each block but the last.
+        hashes : [int]
+            The normalized BBL hash of each block.
+        ins_counts : [int]
+            The number of instructions in each block.
+        signal : int or None
+            The signal that terminated the process, if any.
+    """
+
+    def __init__(self, libs, boundaries, size, flags, ecx, hashes, ins_counts, signal):
+        self.libs = libs
+        self.boundaries = boundaries
+        self.size = size
+        self.flags = flags
+        self.ecx = ecx
+        self.hashes = hashes
+        self.ins_counts = ins_counts
+        self.signal = signal
+
+    def __len__(self):
+        """
+        The number of blocks.
+        """
+        return len(self.boundaries) + 1
+
+    def block_range(self, k):
+        """
+        Returns the byte offsets `(start, end)` of the code of block `k`,
+        excluding the newline ending it.
+        """
+        start = self.boundaries[k - 1] if k > 0 else 0
+        if k < len(self.boundaries):
+            return start, max(start, self.boundaries[k] - 1)
+        return start, max(start, self.size - 1)
+
+    def altered_jump(self, k, data):
+        """
+        Returns the altered jump ending block `k`, or `None` for the last block.
+        The `addr` line of the jump is read from the trace `data`.
+        """
+        if k >= len(self.boundaries):
+            return None
+
+        start = self.boundaries[k]
+        end = data.find("\n", start)
+        line = data[start:end] if end != -1 else data[start:]
+
+        jump_state = JumpState(line, cjumps[line.split()[3][1:]])
+        # Values of an `array('L')` are `long` on Python 2.
+        jump_state.flags = int(self.flags[k])
+        jump_state.ecx = int(self.ecx[k])
+        return jump_state.get_altered_jump()
+
+    def load_blocks(self, il_file):
+        """
+        Reads the trace once and returns the same list of
+        `(code, altered_jump)` as `find_jumps`.
+        """
+        blocks = []
+        with open(il_file, "rb") as f:
+            data = f.read(self.size)
+        for k in range(len(self)):
+            start, end = self.block_range(k)
+            blocks.append((data[start:end], self.altered_jump(k, data)))
+        return blocks
+
+    def map_blocks(self, il_file):
+        """
+        Returns `MappedBlocks` slicing the memory mapped trace.
+        """
+        return MappedBlocks(il_file, self)
+
+
+class MappedBlocks(object):
+    """
+    MappedBlocks
+    ============
+
+    A read-only sequence of `(code, altered_jump)` equal to the list
+    returned by `TraceIndex.load_blocks`, but backed by an `mmap` of the
+    trace. Only the index is kept in memory, the code and the altered jumps
+    are sliced from the mapping when accessed. Call `close` when done.
+    """
+
+    def __init__(self, il_file, index):
+        self.index = index
+        with open(il_file, "rb") as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped.
+                self.data = ""
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError("block index out of range")
+        start, end = self.index.block_range(k)
+        return self.data[start:end], self.index.altered_jump(k, self.data)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def write_code(self, jump_number, file):
+        """
+        Same as `jumps.write_code`, but the blocks are contiguous
+        in the trace, so the prefix is copied from the mapping in
+        chunks of `CHUNK` bytes, never all of it at once.
+        """
+        if jump_number < 0:
+            return
+        last = min(jump_number, len(self) - 1)
+        _, end = self.index.block_range(last)
+
+        # A trace starting with a jump has an empty first block,
+        # which is written as an empty line like any other block.
+        if last > 0 and self.index.boundaries[0] == 0:
+            file.write("\n")
+
+        for position in range(0, end, CHUNK):
+            file.write(self.data[position:min(position + CHUNK, end)])
+        file.write("\n")
+
+    def close(self):
+        if not isinstance(self.data, str):
+            self.data.close()
+
+
+def index_file(il_file):
+    """
+    Indexes the trace in `il_file`. See `index_trace`.
+    """
+    return index_trace(iterate_lines(il_file))
+
+
+def index_stream(stream, copy=None):
+    """
+    Indexes the trace read from the file object `stream`, e.g. the
+    output of iltrans, while it is produced. Every line is also
+    written to the file object `copy`, unless it is `None`.
+    """
+    def lines():
+        for line in stream:
+            if copy is not None:
+                copy.write(line)
+            yield line.rstrip("\n")
+
+    return index_trace(lines())
+
+
+def index_trace(line_iterator):
+    """
+    Reads every line of a trace exactly once and returns a `TraceIndex`.
+    The blocks are split exactly like `find_all_jumps` splits them,
+    but only their byte offsets are kept. The lines are expected
+    without their newline, as yielded by `iterate_lines`.
+    """
+    libs = LibraryIndex()
+    boundaries = array('L')
+    flags = array('L')
+    ecx = array('L')
+
+    # The instruction addresses of each finished block, and of the
+    # block being read. Normalization needs all libraries, and
+    # a library may be loaded after the first instructions.
+    # Labels which cannot be parsed are kept as lines in `raw`,
+    # by their position in `labels`.
+    block_labels = []
+    labels = array('L')
+    raw = {}
+    labels_before_jump = 0
+
+    last_lines = deque(maxlen=FAULT_WINDOW)
+
+    jump_state = None
+    jump_offset = 0
+    offset = 0
+
+    for line in line_iterator:
+        line_offset = offset
+        offset += len(line) + 1
+
+        last_lines.append(line)
+        is_addr = line.startswith("addr 0x")
+
+        if jump_state is not None:
+            if is_addr:
+                boundaries.append(jump_offset)
+                flags.append(jump_state.flags)
+                ecx.append(jump_state.ecx)
+                block, raw = split_raw(raw, labels_before_jump)
+                block_labels.append((labels[:labels_before_jump], block))
+                labels = labels[labels_before_jump:]
+                jump_state = None
+            elif '"EFLAGS"' in line:
+                jump_state.read_flags(line)
+            elif '"R_ECX"' in line:
+                jump_state.read_ecx(line)
+
+        if jump_state is None and is_addr:
+            parts = line.split()
+            if len(parts) < 4 or len(parts[3]) < 1:
+                if parts[0] != 'addr':
+                    logging.error("Fail to parse instruction %s" % parts)
+                continue
+
+            condition = cjumps.get(parts[3][1:])
+            if condition:
+                jump_state = JumpState(line, condition)
+                jump_offset = line_offset
+                labels_before_jump = len(labels)
+            continue
+
+        if not is_addr:
+            append_line(libs, labels, raw, line)
+
+    block_labels.append((labels, raw))
+
+    hashes, ins_counts = hash_labels(libs, block_labels)
+
+    return TraceIndex(libs, boundaries, offset, flags, ecx, hashes, ins_counts,
+                      fault_of_lines(last_lines))
+
+
+def append_line(libs, labels, raw, line):
+    """
+    Adds a `Loaded module` special to `libs`, or the address
+    of a `label pc_0x...` line to `labels`. A label which cannot
+    be parsed is hashed as the line itself, like `normalizeTraceLine`
+    does, so the line is added to `raw` at its position in `labels`.
+
+        >>> labels, raw = [], {}
+        >>> append_line(None, labels, raw, "  label pc_0x10")
+        >>> append_line(None, labels, raw, "label pc_zz")
+        >>> labels, raw
+        ([16, 0], {1: 'label pc_zz'})
+    """
+    stripped = line.strip()
+    if stripped.startswith(SPECIAL_MODULE):
+        libraries_parseline(libs, stripped)
+        return
+    if not stripped.startswith(LABEL_PREFIX):
+        return
+    try:
+        labels.append(int(stripped.split()[1][3:], 0))
+    except (ValueError, OverflowError):
+        raw[len(labels)] = stripped
+        labels.append(0)
+
+
+def split_raw(raw, n):
+    """
+    Splits the unparsable labels `raw` of `append_line` at the `n`:th
+    label, into those before it and those after it, renumbered.
+    """
+    if not raw:
+        return {}, raw
+    return (dict((k, line) for k, line in raw.items() if k < n),
+            dict((k - n, line) for k, line in raw.items() if k >= n))
+
+
+def hash_labels(libs, block_labels):
+    """
+    Computes the normalized BBL hashes and the instruction counts
+    from the label addresses of every block. The result is equal to
+    that of `normalized_bbl_hashes`.
+    """
+    hashes = []
+    ins_counts = []
+
+    for labels, raw in block_labels:
+        normalized = "\n".join(
+            raw[k] if k in raw else "label %s_%d" % location
+            for k, location in enumerate(libs.lookup_many(labels)))
+        hashes.append(adler32_hash(normalized))
+        ins_counts.append(len(labels))
+
+    return hashes, ins_counts
+
+
+def fault_of_lines(lines):
+    """
+    Returns the signal number of the first exception special
+    among `lines`, otherwise `None`.
+
+        >>> fault_of_lines(['special "Exception number 11 happened"'])
+        11
+        >>> fault_of_lines(['label pc_0x8048609']) is None
+        True
+    """
+    for line in lines:
+        if not line.startswith(FAULT_PREFIX):
+            continue
+
+        interest = line[len(FAULT_PREFIX):]
+
+        i = 0
+        while i < len(interest) and interest[i] in "0123456789":
+            i += 1
+
+        return int(interest[:i])
+    return None
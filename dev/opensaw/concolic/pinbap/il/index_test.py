@@ -0,0 +1,196 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from opensaw.concolic.pinbap.il import index
+from opensaw.concolic.pinbap.il import (
+    find_bbls_and_normalized_hashes,
+    find_fault_in_file,
+    find_jumps,
+    index_file,
+    index_stream,
+    read_sidecar,
+    write_altered_jump,
+    write_code,
+    write_sidecar
+)
+from opensaw.concolic.pinbap.il.jumps_test import il_string
+
+fault = """
+special "Exception number 11 occurred"
+"""
+
+
+def test_index_equals_separate_scans(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string)
+
+    index = index_file("ilfile")
+    hashes, counts, libs = find_bbls_and_normalized_hashes("ilfile")
+
+    assert index.load_blocks("ilfile") == find_jumps("ilfile")
+    assert index.hashes == hashes
+    assert index.ins_counts == counts
+    assert index.libs == libs
+    assert len(index.boundaries) == 2
+    assert index.signal is None
+
+
+def test_index_keeps_unparsable_labels(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string.replace("label pc_0x5a225fb6", "label pc_0x5a225fb6\nlabel pc_bad"))
+
+    index = index_file("ilfile")
+    hashes, counts, _ = find_bbls_and_normalized_hashes("ilfile")
+
+    # The line itself is hashed, as by `normalizeTraceLine`.
+    assert index.hashes == hashes
+    assert index.ins_counts == counts
+
+
+# Jumps not taken, with the flag or register of their condition clear,
+# each followed by the `addr` line ending the jump.
+clear_jumps = """
+addr 0x80485b1 @asm "je     0x0000000008048600" @tid "0"
+  @context "EFLAGS" = 0x202, 5, u32, rd
+label pc_0x80485b1
+cjmp R_ZF:bool, 0x8048600:u32, "nocjmp1"
+label nocjmp1
+addr 0x80485c2 @asm "jc     0x0000000008048600" @tid "0"
+  @context "EFLAGS" = 0x202, 5, u32, rd
+label pc_0x80485c2
+cjmp R_CF:bool, 0x8048600:u32, "nocjmp2"
+label nocjmp2
+addr 0x80485d3 @asm "jo     0x0000000008048600" @tid "0"
+  @context "EFLAGS" = 0x202, 5, u32, rd
+label pc_0x80485d3
+cjmp R_OF:bool, 0x8048600:u32, "nocjmp3"
+label nocjmp3
+addr 0x80485e4 @asm "add    $0x17303e,%ebx" @tid "0"
+label pc_0x80485e4
+"""
+
+
+def test_index_clear_flags(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(clear_jumps)
+
+    index = index_file("ilfile")
+    expected = find_jumps("ilfile")
+    altered = [altered_jump for _, altered_jump in expected[:3]]
+
+    assert [line.split("\n")[0] for line in altered] == [
+        "COND:bool = ~R_ZF:bool", "COND:bool = ~R_CF:bool", "COND:bool = ~R_OF:bool"]
+    assert [altered_jump for _, altered_jump in index.load_blocks("ilfile")][:3] == altered
+
+    blocks = index.map_blocks("ilfile")
+    try:
+        assert [altered_jump for _, altered_jump in blocks][:3] == altered
+    finally:
+        blocks.close()
+
+    write_sidecar(index, "ilfile")
+    stored = read_sidecar("ilfile")
+    assert [altered_jump for _, altered_jump in stored.load_blocks("ilfile")][:3] == altered
+
+
+def test_index_signal(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string + fault)
+
+    index = index_file("ilfile")
+
+    assert index.signal == 11
+    assert find_fault_in_file("ilfile") == 11
+
+
+def test_index_specials(tmpdir):
+    # The specials written by the tracer for a coverage run.
+    tmpdir.chdir()
+    tmpdir.join("specials").write(
+        "special \"Loaded module '/bin/prog' from 0x8048000 to 0x804ffff\"\n" + fault)
+
+    index = index_file("specials")
+
+    assert index.libs == {"/bin/prog": (0x8048000, 0x804ffff)}
+    assert index.signal == 11
+    assert len(index.boundaries) == 0
+
+
+def test_index_stream(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string)
+
+    copy = FakeFile()
+    with open("ilfile") as stream:
+        index = index_stream(stream, copy)
+    expected = index_file("ilfile")
+
+    assert "".join(copy.data) == il_string
+    assert index.boundaries == expected.boundaries
+    assert index.hashes == expected.hashes
+    assert index.size == expected.size
+    assert index.load_blocks("ilfile") == find_jumps("ilfile")
+
+
+class FakeFile(object):
+    def __init__(self):
+        self.data = []
+
+    def write(self, data):
+        self.data.append(data)
+
+
+def test_mapped_blocks(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string)
+
+    blocks = find_jumps("ilfile")
+    mapped = index_file("ilfile").map_blocks("ilfile")
+
+    assert len(mapped) == len(blocks)
+    assert list(mapped) == blocks
+    assert mapped[-1] == blocks[-1]
+
+    # The prefix is written as one slice, equal to the joined blocks.
+    for jump_number in range(len(blocks) - 1):
+        expected, written = FakeFile(), FakeFile()
+        write_code(blocks, jump_number, expected)
+        write_altered_jump(blocks, jump_number, expected)
+        write_code(mapped, jump_number, written)
+        write_altered_jump(mapped, jump_number, written)
+        assert "".join(written.data) == "".join(expected.data)
+
+    mapped.close()
+
+
+def test_mapped_blocks_write_code_in_chunks(tmpdir, monkeypatch):
+    monkeypatch.setattr(index, "CHUNK", 7)
+    tmpdir.chdir()
+    # Starts with a jump, so the first block is empty.
+    tmpdir.join("ilfile").write(clear_jumps.lstrip())
+
+    blocks = find_jumps("ilfile")
+    mapped = index_file("ilfile").map_blocks("ilfile")
+    try:
+        assert blocks[0][0] == ""
+        for jump_number in range(len(blocks)):
+            expected, written = FakeFile(), FakeFile()
+            write_code(blocks, jump_number, expected)
+            write_code(mapped, jump_number, written)
+            assert "".join(written.data) == "".join(expected.data)
+    finally:
+        mapped.close()
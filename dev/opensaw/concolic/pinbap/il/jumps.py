@@ -19,6 +19,7 @@ import re
 from zlib import adler32
 
 from opensaw.concolic.pinbap.il.x86.cjumps import cjumps
+from opensaw.concolic.pinbap.il.libraries import LibraryIndex
 import logging
 import os
 
@@ -30,6 +31,7 @@ def set_subprocess(s):
 # Local Constants
 # Compile regex once.
 SPECIAL_MODULE = "special \"Loaded module "
+BRANCH_MARKER = "opensaw_branch_"
 hex_matcher = re.compile(r"0x([0-9a-f]+)")
 
 
@@ -61,6 +63,19 @@ def from_trace(trace_file, il_file, iltrans="iltrans", timeout=0):
         "-pp-ast", il_file], timeout=timeout, save_stdout=False, save_stderr=False)
 
 
+def from_trace_stream(trace_file, consume, iltrans="iltrans", timeout=0):
+    """
+    Lifts the trace like `from_trace`, but the IL is written to a pipe
+    instead of a file. `consume` is called with the read end of the pipe
+    while iltrans is running, and its result is returned.
+    """
+    return subprocess.check_stream([
+        iltrans,
+        "-serializedtrace", trace_file,
+        "-replace-unknowns",
+        "-pp-ast", "/dev/stdout"], consume, timeout=timeout)
+
+
 def to_path_condition(il_file, pc_file, iltrans="iltrans", timeout=0, save_stdout=False, save_stderr=False):
     return silent_call([
         iltrans,
@@ -209,7 +224,7 @@ def libraries_parseline(libraries, line):
 
 
 def parse_libraries(line_iterator):
-    libraries = {}
+    libraries = LibraryIndex()
 
     for line in line_iterator:
         line = str.strip(line)
@@ -219,6 +234,10 @@ def parse_libraries(line_iterator):
 
 
 def library_of_address(libraries, addr):
+    # Built once per trace, see `libraries.LibraryIndex`.
+    if isinstance(libraries, LibraryIndex):
+        return libraries.lookup(addr)
+
     for lib, (low, high) in libraries.items():
         if low <= addr <= high:
             return lib, addr - low
@@ -279,6 +298,11 @@ def write_code(blocks, jump_number, file):
     if jump_number < 0:
         return
 
+    # Blocks backed by the trace itself, see `index.MappedBlocks`,
+    # write the prefix straight from the trace.
+    if hasattr(blocks, "write_code"):
+        return blocks.write_code(jump_number, file)
+
     for i, (code, _) in enumerate(blocks):
         file.write(code)
         file.write("\n")
@@ -303,6 +327,39 @@ def write_altered_generator(blocks, jump_number, file):
             file.write(altered_jump)
             break
 
+def altered_condition(altered_jump):
+    """
+    Returns the condition assigned to `COND` by an altered jump.
+
+        >>> altered_condition('COND:bool = R_ZF:bool\\naddr 0x80485b1')
+        'R_ZF:bool'
+    """
+    first_line = altered_jump.split("\n", 1)[0]
+    return first_line.split(" = ", 1)[1]
+
+
+def branch_marker(jump_number):
+    """
+    Returns the name of the variable marking the altered
+    condition of the given `jump_number`.
+    """
+    return "%s%d" % (BRANCH_MARKER, jump_number)
+
+
+def write_marked_code(blocks, file):
+    """
+    Writes the code of all `blocks` to `file`. The altered condition
+    of the jump ending every block is assigned to its `branch_marker`,
+    before the jump itself, so that a single trace formula contains
+    the path condition of every branch.
+    """
+    for i, (code, altered_jump) in enumerate(blocks):
+        file.write(code)
+        file.write("\n")
+
+        if altered_jump is not None:
+            file.write("%s:bool = %s\n" % (branch_marker(i), altered_condition(altered_jump)))
+
 def write_altered_jump(blocks, jump_number, file):
     """
     Given a list of `blocks`, writes the altered jump ending the
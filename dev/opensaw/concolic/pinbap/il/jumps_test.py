@@ -23,6 +23,7 @@ from opensaw.concolic.pinbap.il import (
     parse_libraries,
     write_altered_jump,
     write_code,
+    write_marked_code,
     iterate_lines,
     find_jumps
 )
@@ -154,3 +155,18 @@ def test_first_hex():
 
     # Defaults to 0.
     assert get_first_hex("") is 0x0
+
+
+def test_write_marked_code(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string)
+
+    blocks = find_jumps("ilfile")
+    marked = FakeFile()
+    write_marked_code(blocks, marked)
+
+    # The altered condition of every jump is assigned to its marker,
+    # before the jump itself.
+    assert "opensaw_branch_0:bool = R_ZF:bool\naddr 0x80485b1" in "".join(marked.data)
+    assert "opensaw_branch_1:bool = ~(R_ECX:u32 == 0:u32)\naddr 0x8048609" in "".join(marked.data)
+    assert "opensaw_branch_2" not in "".join(marked.data)
@@ -0,0 +1,202 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+An interval index of the libraries loaded by a traced process.
+
+`LibraryIndex` is the dictionary of libraries mapped to their low
+and high addresses, as parsed from the `Loaded module` specials,
+and resolves addresses to `(library, offset)` pairs by bisecting the
+sorted low addresses, instead of scanning all the libraries.
+The libraries are assumed not to overlap.
+
+`lookup_many` resolves a whole sequence of addresses at once. It uses
+`numpy` when available, otherwise it sorts the addresses and sweeps
+them together with the libraries.
+
+`location_keys` turns addresses into integer keys of their library
+and offset, e.g. to compare coverage between runs.
+"""
+from bisect import bisect_right
+from zlib import adler32
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UNKNOWN = "unknown"
+
+
+class LibraryIndex(dict):
+    """
+    LibraryIndex
+    ============
+
+    A `dict` of `{library: (low, high)}`, which keeps the libraries
+    sorted by their low address. The sorted intervals are rebuilt
+    on the first lookup after the libraries changed.
+
+        >>> libs = LibraryIndex({"libc": (0x1000, 0x1fff), "main": (0x8000, 0x8fff)})
+        >>> libs.lookup(0x1010)
+        ('libc', 16)
+        >>> libs.lookup(0x2000)
+        ('unknown', 8192)
+        >>> libs.lookup_many([0x8001, 0x10, 0x1fff])
+        [('main', 1), ('unknown', 16), ('libc', 4095)]
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.intervals = None
+
+    def __setitem__(self, library, interval):
+        dict.__setitem__(self, library, interval)
+        self.intervals = None
+
+    def __delitem__(self, library):
+        dict.__delitem__(self, library)
+        self.intervals = None
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self.intervals = None
+
+    def pop(self, *args):
+        self.intervals = None
+        return dict.pop(self, *args)
+
+    def clear(self):
+        dict.clear(self)
+        self.intervals = None
+
+    def __reduce__(self):
+        return LibraryIndex, (dict(self),)
+
+    def sorted_intervals(self):
+        """
+        Returns the lists of low addresses, high addresses
+        and libraries, sorted by low address.
+        """
+        intervals = self.intervals
+        if intervals is None:
+            items = sorted((low, high, library) for library, (low, high) in self.items())
+            intervals = ([low for low, _, _ in items],
+                         [high for _, high, _ in items],
+                         [library for _, _, library in items])
+            # Assigned at once, other threads may be looking up addresses.
+            self.intervals = intervals
+        return intervals
+
+    def lookup(self, addr):
+        """
+        Returns the library containing `addr`, and the offset
+        of `addr` in it. Same as `jumps.library_of_address`.
+        """
+        lows, highs, libraries = self.sorted_intervals()
+        i = bisect_right(lows, addr) - 1
+        if i >= 0 and addr <= highs[i]:
+            return libraries[i], addr - lows[i]
+        return UNKNOWN, addr
+
+    def lookup_many(self, addresses):
+        """
+        Returns `lookup(addr)` for every address in `addresses`.
+        """
+        if numpy is not None:
+            return self.lookup_numpy(addresses)
+
+        lows, highs, libraries = self.sorted_intervals()
+        result = [None] * len(addresses)
+
+        # Sweep the sorted addresses and libraries together.
+        i = -1
+        order = sorted(range(len(addresses)), key=addresses.__getitem__)
+        for k in order:
+            addr = addresses[k]
+            while i + 1 < len(lows) and lows[i + 1] <= addr:
+                i += 1
+            if i >= 0 and addr <= highs[i]:
+                result[k] = libraries[i], addr - lows[i]
+            else:
+                result[k] = UNKNOWN, addr
+
+        return result
+
+    def resolve_numpy(self, addresses):
+        """
+        Returns the index of the library in `sorted_intervals` containing
+        every address, `-1` if none, and the offsets as `numpy` arrays.
+        """
+        lows, highs, _ = self.sorted_intervals()
+        addr = numpy.asarray(addresses, dtype=numpy.uint64)
+        lows = numpy.asarray(lows, dtype=numpy.uint64)
+        highs = numpy.asarray(highs, dtype=numpy.uint64)
+
+        i = numpy.searchsorted(lows, addr, side="right") - 1
+        found = i >= 0
+        found[found] &= addr[found] <= highs[i[found]]
+        i[~found] = -1
+
+        offsets = addr.copy()
+        offsets[found] -= lows[i[found]]
+        return i, offsets
+
+    def lookup_numpy(self, addresses):
+        _, _, libraries = self.sorted_intervals()
+        i, offsets = self.resolve_numpy(addresses)
+
+        libraries = [libraries[k] if k >= 0 else UNKNOWN for k in i.tolist()]
+        return list(zip(libraries, (int(offset) for offset in offsets.tolist())))
+
+    def location_keys(self, addresses):
+        """
+        Returns a key for the location of every address, see `location_key`.
+        A `numpy` array if available, otherwise a list.
+
+            >>> libs = LibraryIndex({"libc": (0x1000, 0x1fff)})
+            >>> list(libs.location_keys([0x1010])) == [location_key("libc", 0x10)]
+            True
+        """
+        if numpy is None:
+            return [location_key(library, offset) for library, offset in self.lookup_many(addresses)]
+
+        _, _, libraries = self.sorted_intervals()
+        i, offsets = self.resolve_numpy(addresses)
+
+        # The hash of an unknown library is last, at index -1.
+        hashes = numpy.array([library_hash(library) for library in libraries] + [library_hash(UNKNOWN)],
+                             dtype=numpy.uint64)
+        return (hashes[i] << numpy.uint64(32)) | (offsets & numpy.uint64(0xffffffff))
+
+
+def library_hash(library):
+    return adler32(library.encode("utf-8")) & 0xffffffff
+
+
+def location_key(library, offset):
+    """
+    Returns an integer identifying the `offset` in `library`, which is
+    the same in every run, unlike the address. The hash of the library
+    is in the upper 32 bits, and the offset in the lower.
+
+        >>> location_key("libc", 0x10) & 0xffffffff
+        16
+        >>> location_key("libc", 0x10) == location_key("libm", 0x10)
+        False
+    """
+    return (library_hash(library) << 32) | (offset & 0xffffffff)
@@ -0,0 +1,63 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import pickle
+
+from opensaw.concolic.pinbap.il import libraries
+from opensaw.concolic.pinbap.il.libraries import LibraryIndex
+from opensaw.concolic.pinbap.il.jumps import library_of_address
+
+libs = {
+    "main": (0x8048000, 0x804ffff),
+    "libc.so.6": (0xf7d00000, 0xf7efffff),
+    "ld-linux.so.2": (0xf7f00000, 0xf7f2ffff),
+}
+
+addresses = [0x0, 0x8048000, 0x804ffff, 0x8050000, 0xf7d12345,
+             0xf7efffff, 0xf7f00000, 0xf7f30000, 0xffffffff]
+
+
+def test_lookup():
+    index = LibraryIndex(libs)
+    for addr in addresses:
+        # The linear scan of a plain dictionary.
+        assert index.lookup(addr) == library_of_address(libs, addr)
+        assert library_of_address(index, addr) == library_of_address(libs, addr)
+
+
+def test_lookup_many(monkeypatch):
+    index = LibraryIndex(libs)
+    expected = [library_of_address(libs, addr) for addr in addresses]
+    assert index.lookup_many(addresses) == expected
+    assert index.lookup_many(list(reversed(addresses))) == list(reversed(expected))
+
+    # The sweep, when numpy is not available.
+    monkeypatch.setattr(libraries, "numpy", None)
+    assert index.lookup_many(addresses) == expected
+    assert LibraryIndex().lookup_many(addresses[:2]) == [("unknown", 0x0), ("unknown", 0x8048000)]
+
+
+def test_modified_index():
+    index = LibraryIndex(libs)
+    assert index.lookup(0x10) == ("unknown", 0x10)
+
+    index["vdso"] = (0x0, 0xfff)
+    assert index.lookup(0x10) == ("vdso", 0x10)
+
+    loaded = pickle.loads(pickle.dumps(index))
+    assert isinstance(loaded, LibraryIndex)
+    assert loaded.lookup(0x10) == ("vdso", 0x10)
@@ -0,0 +1,125 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+A pool of processes indexing `.il` traces and writing code from them.
+
+Indexing a trace with `index_file` is pure Python work, so threads
+indexing traces take turns holding the GIL, however many of them
+there are. The `ParsePool` indexes traces in worker processes instead.
+Only the name of the trace is passed to a worker, which writes the
+`TraceIndex` to the `.ilx` sidecar of the trace, where the caller
+loads it from. Neither the lines nor the blocks are ever pickled.
+
+The code given to BAP for a branch, or for the whole trace, is written
+the same way: the worker maps the blocks of the trace from its sidecar
+and writes the code to a file named by the caller.
+
+The workers are forked when the pool is created, so the pool should
+be created before any threads are started.
+"""
+import errno
+import logging
+import multiprocessing
+import os
+import signal
+
+from opensaw.concolic.pinbap.il.index import index_file
+from opensaw.concolic.pinbap.il.jumps import write_altered_jump, write_code, write_marked_code
+from opensaw.concolic.pinbap.il.sidecar import read_sidecar, write_sidecar
+
+
+def ignore_interrupts():
+    # Interrupts are handled by the main process, which closes the pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def index_to_sidecar(il_file):
+    """
+    Indexes `il_file` and writes the index to its sidecar.
+    Runs in a worker process.
+    """
+    # A missing trace would be indexed as an empty one.
+    if not os.path.exists(il_file):
+        raise IOError(errno.ENOENT, os.strerror(errno.ENOENT), il_file)
+    write_sidecar(index_file(il_file), il_file)
+
+
+def code_to_file(il_file, out_file, jump_number=None):
+    """
+    Writes the code of `il_file` to `out_file`, up to and including the
+    altered jump ending the `jump_number`:th block, or the code of every
+    block with its altered condition marked if `jump_number` is `None`.
+    Runs in a worker process.
+    """
+    if not os.path.exists(il_file):
+        raise IOError(errno.ENOENT, os.strerror(errno.ENOENT), il_file)
+    index = read_sidecar(il_file)
+    if index is None:
+        index = index_file(il_file)
+    blocks = index.map_blocks(il_file)
+    try:
+        with open(out_file, "w") as file:
+            if jump_number is None:
+                write_marked_code(blocks, file)
+            else:
+                write_code(blocks, jump_number, file)
+                write_altered_jump(blocks, jump_number, file)
+    finally:
+        blocks.close()
+
+
+class ParsePool(object):
+    """
+    ParsePool
+    =========
+
+    Indexes traces in `processes` worker processes.
+    Can be used by several threads at once.
+    """
+
+    def __init__(self, processes):
+        self.pool = multiprocessing.Pool(processes, ignore_interrupts)
+
+    def index(self, il_file):
+        """
+        Returns the `TraceIndex` of `il_file`, or `None` if the worker
+        failed to write it. The calling thread waits for the worker
+        without holding the GIL.
+        """
+        try:
+            self.pool.apply(index_to_sidecar, (il_file,))
+        except (IOError, OSError) as e:
+            logging.error("Could not index trace %s in a worker process: %s" % (il_file, repr(e)))
+            return None
+        return read_sidecar(il_file)
+
+    def write_code(self, il_file, out_file, jump_number=None):
+        """
+        Writes code of `il_file` to `out_file` in a worker, see
+        `code_to_file`. Returns `False` if the worker failed.
+        """
+        try:
+            self.pool.apply(code_to_file, (il_file, out_file, jump_number))
+        except (IOError, OSError, IndexError) as e:
+            logging.error("Could not write code of trace %s to %s in a worker process: %s" % (il_file, out_file, repr(e)))
+            return False
+        return True
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
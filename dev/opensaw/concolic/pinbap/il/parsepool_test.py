@@ -0,0 +1,73 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from StringIO import StringIO
+
+from opensaw.concolic.pinbap.il import ParsePool, index_file, sidecar_of, write_altered_jump, write_code, write_marked_code
+from opensaw.concolic.pinbap.il.jumps_test import il_string
+
+
+def test_parse_pool(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string)
+
+    pool = ParsePool(2)
+    try:
+        index = pool.index("ilfile")
+    finally:
+        pool.close()
+
+    expected = index_file("ilfile")
+    assert tmpdir.join(sidecar_of("ilfile")).check()
+    assert index.load_blocks("ilfile") == expected.load_blocks("ilfile")
+    assert list(index.hashes) == expected.hashes
+    assert index.libs == expected.libs
+
+
+def test_parse_pool_missing_trace(tmpdir):
+    tmpdir.chdir()
+
+    pool = ParsePool(1)
+    try:
+        assert pool.index("missing") is None
+    finally:
+        pool.close()
+
+    assert not tmpdir.join(sidecar_of("missing")).check()
+
+
+def test_parse_pool_write_code(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string)
+    blocks = index_file("ilfile").load_blocks("ilfile")
+
+    pool = ParsePool(1)
+    try:
+        pool.index("ilfile")
+        assert pool.write_code("ilfile", "prefix", 1)
+        assert pool.write_code("ilfile", "marked")
+        assert not pool.write_code("missing", "none", 1)
+    finally:
+        pool.close()
+
+    prefix, marked = StringIO(), StringIO()
+    write_code(blocks, 1, prefix)
+    write_altered_jump(blocks, 1, prefix)
+    write_marked_code(blocks, marked)
+    assert tmpdir.join("prefix").read() == prefix.getvalue()
+    assert tmpdir.join("marked").read() == marked.getvalue()
+    assert not tmpdir.join("none").check()
@@ -0,0 +1,134 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+The `.ilx` sidecar is a compact binary copy of a `TraceIndex`,
+written next to the `.il` trace it indexes. Loading it only reads
+a header and a few arrays, so the trace does not have to be parsed
+again by the BAP stage.
+
+The layout is a `HEADER` followed by the arrays:
+
+ array        | type  | length
+--------------|-------|---------------
+ hashes       | `'I'` | blocks
+ ins_counts   | `'I'` | blocks
+ boundaries   | `'L'` | jumps
+ flags        | `'L'` | jumps
+ ecx          | `'L'` | jumps
+
+and finally the libraries as JSON. The arrays are stored in the
+byte order of the host, the sidecar is not meant to be portable.
+"""
+import json
+import logging
+import os
+import struct
+import sys
+from array import array
+
+from opensaw.concolic.pinbap.il.index import TraceIndex
+from opensaw.concolic.pinbap.il.libraries import LibraryIndex
+
+SUFFIX = ".ilx"
+MAGIC = b"ILX1"
+
+# magic, itemsize of 'I', itemsize of 'L', little endian,
+# blocks, jumps, length of libraries, signal, size of the trace
+HEADER = struct.Struct("<4sBBBIIIiQ")
+
+
+def sidecar_of(il_file):
+    """
+    Returns the name of the sidecar of `il_file`.
+
+        >>> sidecar_of("trace.il")
+        'trace.il.ilx'
+    """
+    return il_file + SUFFIX
+
+
+def write_sidecar(index, il_file):
+    """
+    Writes `index` to the sidecar of `il_file`. The sidecar is written
+    to a temporary name first, so readers never see a partial file.
+    """
+    path = sidecar_of(il_file)
+    temp_path = path + ".tmp"
+
+    libs = json.dumps(index.libs).encode("utf-8")
+    signal = -1 if index.signal is None else index.signal
+
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, array('I').itemsize, array('L').itemsize,
+                            sys.byteorder == "little",
+                            len(index.hashes), len(index.boundaries),
+                            len(libs), signal, index.size))
+        array('I', index.hashes).tofile(f)
+        array('I', index.ins_counts).tofile(f)
+        array('L', index.boundaries).tofile(f)
+        array('L', index.flags).tofile(f)
+        array('L', index.ecx).tofile(f)
+        f.write(libs)
+
+    os.rename(temp_path, path)
+    return path
+
+
+def read_sidecar(il_file):
+    """
+    Returns the `TraceIndex` stored in the sidecar of `il_file`,
+    or `None` if there is no valid sidecar for the trace.
+    """
+    path = sidecar_of(il_file)
+
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(il_file):
+            return None
+        trace_size = os.path.getsize(il_file)
+
+        with open(path, "rb") as f:
+            (magic, int_size, long_size, little, blocks, jumps,
+             libs_size, signal, size) = HEADER.unpack(f.read(HEADER.size))
+
+            if (magic != MAGIC or
+                    int_size != array('I').itemsize or
+                    long_size != array('L').itemsize or
+                    bool(little) != (sys.byteorder == "little") or
+                    size not in (trace_size, trace_size + 1)):
+                return None
+
+            hashes = read_array(f, 'I', blocks)
+            ins_counts = read_array(f, 'I', blocks)
+            boundaries = read_array(f, 'L', jumps)
+            flags = read_array(f, 'L', jumps)
+            ecx = read_array(f, 'L', jumps)
+            libs = json.loads(f.read(libs_size).decode("utf-8"))
+    except (IOError, OSError, EOFError, ValueError, struct.error) as e:
+        logging.debug("Could not read sidecar %s: %s" % (path, repr(e)))
+        return None
+
+    libs = LibraryIndex((str(lib), (low, high)) for lib, (low, high) in libs.items())
+
+    return TraceIndex(libs, boundaries, size, flags, ecx, hashes, ins_counts,
+                      None if signal < 0 else signal)
+
+
+def read_array(f, typecode, length):
+    values = array(typecode)
+    values.fromfile(f, length)
+    return values
@@ -0,0 +1,57 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from opensaw.concolic.pinbap.il import (
+    find_jumps,
+    index_file,
+    read_sidecar,
+    sidecar_of,
+    write_sidecar
+)
+from opensaw.concolic.pinbap.il.jumps_test import il_string
+
+
+def test_sidecar(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string)
+
+    assert read_sidecar("ilfile") is None
+
+    index = index_file("ilfile")
+    assert write_sidecar(index, "ilfile") == sidecar_of("ilfile")
+
+    loaded = read_sidecar("ilfile")
+    assert list(loaded.hashes) == index.hashes
+    assert list(loaded.ins_counts) == index.ins_counts
+    assert loaded.boundaries == index.boundaries
+    assert loaded.flags == index.flags
+    assert loaded.ecx == index.ecx
+    assert loaded.libs == index.libs
+    assert loaded.signal is None
+
+    # The altered jumps are rebuilt from the offsets and the trace.
+    assert loaded.load_blocks("ilfile") == find_jumps("ilfile")
+
+
+def test_sidecar_of_other_trace(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join("ilfile").write(il_string)
+    write_sidecar(index_file("ilfile"), "ilfile")
+
+    # A sidecar not matching the size of the trace is ignored.
+    tmpdir.join("ilfile").write(il_string + il_string)
+    assert read_sidecar("ilfile") is None
@@ -92,10 +92,10 @@ class Bit(Condition):
     def is_sat(self, register, _other):
         """
             >>> a = Bit("a", 1)
-            >>> a.is_sat(3, 0), a.is_sat(1, 0)
-            (True, False)
+            >>> a.is_sat(3, 0), a.is_sat(1, 0), a.is_sat(1L, 0)
+            (True, False, False)
         """
-        return (self.bit & register) is not 0
+        return (self.bit & register) != 0
 
 
 def unary(fmt, check_sat):
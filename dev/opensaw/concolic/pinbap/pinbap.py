@@ -18,23 +18,71 @@
 import os
 
 import il
-from opensaw.utils.funs import findFiles
+from opensaw.utils.native import program_arguments
 import logging
 import subprocess
 import solver.cvc as solver
+import coverage
+from solver.formula import BranchFormula
+from solver.pool import PipeBackend, SolverPool, StpBackend
+from solver.cache import QueryCache
 from re import compile
 import os
 import traceback
 import sys
+import threading
+import shutil
+import tempfile
 from os.path import basename
 
 perf = None
+# The processes indexing traces started by `--parseProcesses`, see `il.parsepool`.
+parse_pool = None
+
 def setPerformanceMeasurer(p):
     global perf
     perf = p
     solver.set_subprocess(p.solver)
     il.set_subprocess(p.il_tool)
 
+def startEngine(options):
+    """
+    Starts the resources shared by all traces, the solver pool enabled
+    by `--solverPool`, the solver cache enabled by `--solverCache`, the
+    processes indexing traces enabled by `--parseProcesses`, and enables
+    `--sliceConstraints`.
+    """
+    global parse_pool
+    solver.set_slicing(options.sliceConstraints)
+
+    if options.parseProcesses > 0:
+        parse_pool = il.ParsePool(options.parseProcesses)
+
+    if options.solverCache > 0:
+        directory = QueryCache.DIRECTORY if options.persistSolverCache else None
+        solver.set_cache(QueryCache(options.solverCache, directory))
+
+    if not options.solverPool:
+        return
+
+    if options.solverCommand:
+        cmd = options.solverCommand.split()
+        factory = lambda: PipeBackend(cmd)
+    else:
+        factory = StpBackend
+    solver.set_pool(SolverPool(factory, options.bapPool, report=solver.report_pool_usage))
+
+def stopEngine():
+    global parse_pool
+    if parse_pool is not None:
+        parse_pool.close()
+        parse_pool = None
+    if solver.pool is not None:
+        solver.pool.close()
+        solver.set_pool(None)
+    solver.set_cache(None)
+    solver.set_slicing(False)
+
 # This is the class that contains the base for the functions of pinbap,
 # The PinBap class below wraps the stateless functions of OldMethods
 # into a stateful object.
@@ -47,22 +95,26 @@ class OldMethods(object):
     #
     stack_index = compile("\(%e[bs]p,")
 
+    # Blocks which can be indexed, as opposed to generators.
+    indexable = (list, il.MappedBlocks)
+
 
 
     @staticmethod
-    def create_input_from_il(blocks, jump_number, prev_input, options):
+    def create_input_from_il(blocks, jump_number, prev_input, options, trace_file=None):
         # TODO: Maybe use actual temporary files?
         il_file = "generating-{}-{}.il".format(hex(hash(prev_input)), jump_number)
         pc_file = "generating-{}-{}{}".format(hex(hash(prev_input)), jump_number, solver.extension)
         try:
-            with open(il_file, "w") as file:
-                # For now allow both generator and list to be able to test different
-                # solutions.
-                if type(blocks) == list:
-                    il.write_code(blocks, jump_number, file)
-                    il.write_altered_jump(blocks, jump_number, file)
-                else:
-                    il.write_altered_generator(blocks, jump_number, file)
+            if not OldMethods.write_in_pool(trace_file, il_file, jump_number):
+                with open(il_file, "w") as file:
+                    # For now allow both generator and list to be able to test different
+                    # solutions.
+                    if isinstance(blocks, OldMethods.indexable):
+                        il.write_code(blocks, jump_number, file)
+                        il.write_altered_jump(blocks, jump_number, file)
+                    else:
+                        il.write_altered_generator(blocks, jump_number, file)
 
             new_input = OldMethods.il_to_new_input(il_file, pc_file, prev_input, options)
         finally:
@@ -72,6 +124,65 @@ class OldMethods(object):
 
         return new_input
 
+    @staticmethod
+    def write_in_pool(trace_file, il_file, jump_number=None):
+        """
+        Writes code of `trace_file` to `il_file` in a process of the
+        `parse_pool`, see `il.parsepool.code_to_file`. Returns `False`
+        if there is no pool or it failed, the caller then writes the code.
+        """
+        if parse_pool is None or trace_file is None:
+            return False
+        return parse_pool.write_code(os.path.abspath(trace_file), os.path.abspath(il_file), jump_number)
+
+    @staticmethod
+    def create_trace_formula(blocks, trace_file, options):
+        """
+        Translates the whole trace to a single formula, where the altered
+        condition of every branch is marked. Returns a `BranchFormula`,
+        or `None` if the trace could not be translated or split per branch.
+        """
+        il_file = "batch-{}".format(basename(trace_file))
+        pc_file = "batch-{}{}".format(basename(trace_file), solver.extension)
+        formula = None
+        try:
+            if not OldMethods.write_in_pool(trace_file, il_file):
+                with open(il_file, "w") as file:
+                    il.write_marked_code(blocks, file)
+
+            try:
+                il.to_path_condition(il_file, pc_file, options.bap, timeout=options.extTimeout, save_stderr=True, save_stdout=True)
+            except subprocess.CalledProcessError as e:
+                logging.error("Could not create trace formula %s from: %s. Error: '%s', Cmd: '%s'. Output: '%s'" % (pc_file, il_file, repr(e), " ".join(e.cmd), e.output))
+                return None
+
+            with open(pc_file) as file:
+                formula = BranchFormula(file.read(), il.BRANCH_MARKER)
+
+            if not formula.is_splittable():
+                # Every branch would share the constraints after it.
+                logging.debug("Trace formula of %s cannot be split per branch" % trace_file)
+                formula = None
+                return None
+        finally:
+            ignore_fail = not options.keepFailed
+            PinBap._cleanup([pc_file, il_file], cleanup=(formula is not None or ignore_fail))
+
+        logging.debug("Trace formula of %s marks %d branches" % (trace_file, len(formula.markers)))
+        return formula
+
+    @staticmethod
+    def create_input_from_formula(formula, jump_number, prev_input, options):
+        """
+        Solves the query for altering `jump_number`, cut from the trace formula.
+        """
+        try:
+            solution = solver.solve_query(formula.query(jump_number), timeout=options.extTimeout)
+        except subprocess.CalledProcessError as e:
+            logging.error("Failed to create new input for branch %d due to solver crash. Cmd: '%s'" % (jump_number, " ".join(e.cmd)))
+            return None, False
+        return solver.new_input_from_solution(prev_input, solution)
+
     @staticmethod
     def il_to_new_input(il_file, pc_file, prev_input, options):
         if not os.path.exists(il_file):
@@ -99,7 +210,7 @@ class OldMethods(object):
             with open(il_file_name, "w") as b:
                 # Write all previous blocks
                 il.write_code(blocks, jump_i - 1, b)
-                if type(blocks) == list:
+                if isinstance(blocks, OldMethods.indexable):
                     source = blocks[jump_i][0]
                 else:
                     source = blocks.next()[0]
@@ -124,7 +235,7 @@ class OldMethods(object):
         write. If one is found, it will call try_to_break_stack_access.
         """
         blocks = blockfunc()
-        if type(blocks) == list:
+        if isinstance(blocks, OldMethods.indexable):
             target_block = blocks[jump_i][0]
         else:
             for idx,jump in enumerate(blocks):
@@ -142,30 +253,50 @@ class OldMethods(object):
 class PinBapError(object):
     def __init__(self, trace_file, logfile, stdout, stderr, error_desc):
         self.error = error_desc
+        self.stdout = stdout
+        self.stderr = stderr
 
     def isSuccess(self):
         return False
 
     def getError(self):
+        if self.stderr:
+            return "%s. Last output on stderr: '%s'" % (self.error, self.stderr)
         return self.error
 
+    def getDebugString(self):
+        return self.stderr
+
 
 class PinBap(object):
     IL_TRACE_SUFFIX = ".il"
     BIN_TRACE_SUFFIX = ".bpt"
+    RUN_DIRECTORY_SUFFIX = ".pin"
     COVERAGE_SUFFIX = ".cov"
+    BINARY_COVERAGE_SUFFIX = ".bcov"
+    # The loaded modules and fatal signal of a coverage run, see `executeCoverage`.
+    SPECIALS_SUFFIX = ".specials"
+    # Bytes kept of the end of the stdout and stderr of a tracer run.
+    TRACER_OUTPUT_TAIL = 64 * 1024
 
-    def __init__(self, trace_file, input_file=None, success=True, coverage_file=None, stdout = None, stderr = None):
+    def __init__(self, trace_file, input_file=None, success=True, coverage_file=None, stdout = None, stderr = None, index=None):
         self.file = trace_file
         self.input_file = input_file
         self.success = success
         self.coverage_file = coverage_file
         self.cache = {}
+        if index is not None:
+            # Indexed while the trace was lifted, see `--streamTraces`.
+            self.cache["index"] = index
         self.stdout = stdout
         self.stderr = stderr
+        self.index_lock = threading.RLock()
+        self.formula_lock = threading.Lock()
 
     def cleanup(self):
-        PinBap._cleanup([self.getFilename()], cleanup=True)
+        self.__closeJumps()
+        self.cache.pop("formula", None)
+        PinBap._cleanup([self.getFilename(), il.sidecar_of(self.getFilename())], cleanup=True)
 
     def getDebugString(self):
         return self.stderr
@@ -180,63 +311,107 @@ class PinBap(object):
         return self.file
 
     def remove(self):
-        PinBap._cleanup([self.getFilename(),self.coverage_file],cleanup=True)
+        self.__closeJumps()
+        self.cache.pop("formula", None)
+        PinBap._cleanup([self.getFilename(),il.sidecar_of(self.getFilename()),self.coverage_file],cleanup=True)
 
     def removeCoverage(self):
         PinBap._cleanup([ self.coverage_file], cleanup=True)
 
     def getSignal(self):
-         return il.find_fault_in_file(self.getFilename())
+        return self.__getIndex().signal
 
     def getCoverage(self):
+        arrays = self.getCoverageArrays()
+        if arrays is None:
+            return None
+        keys, paths = map(coverage.as_list, arrays)
+        return dict(zip(keys, paths))
+
+    def getCoverageArrays(self):
+        """
+        Returns the keys of the visited blocks, see `il.location_key`,
+        and their visit enums, as two sequences. Both are `numpy`
+        arrays when `numpy` is available.
+        """
         if not os.path.exists(self.coverage_file):
             logging.error('Could not find coverage file %s' % self.coverage_file)
             return None
-        libs = self.__getLibs()
-        with open(self.coverage_file) as block_file:
-            block_dict = dict()
 
-            entries = block_file.read().split(",")
+        if self.coverage_file.endswith(PinBap.BINARY_COVERAGE_SUFFIX):
+            addresses, paths = coverage.read_binary_coverage(self.coverage_file)
+        else:
+            addresses, paths = coverage.read_text_coverage(self.coverage_file)
 
-            for entry in entries:
-                if ":" not in entry:
-                    continue
-                address, taken_branches = map(int, entry.split(":"))
-                haddress = hash(il.library_of_address(libs,address))
-                block_dict[haddress] = taken_branches
-            return block_dict
+        # Resolve all the addresses at once.
+        return self.__getLibs().location_keys(addresses), paths
 
-    def __fillCache(self):
-        hashes, ins_counts, libs = il.find_bbls_and_normalized_hashes(self.getFilename())
-        self.cache["hashes"] = hashes
-        self.cache["ins_counts"] = ins_counts
-        self.cache["libs"] = libs
+    def __getIndex(self):
+        """
+        Indexes the trace in a single pass, and serves every accessor
+        from the result. The index is stored in a `.ilx` sidecar next
+        to the trace, so that later stages can load it without parsing
+        the trace again. With `--parseProcesses` the trace is indexed
+        by another process, which writes the sidecar.
+        """
+        with self.index_lock:
+            if "index" not in self.cache:
+                index = il.read_sidecar(self.getFilename())
+                if index is None and parse_pool is not None:
+                    index = parse_pool.index(self.getFilename())
+                if index is None:
+                    index = il.index_file(self.getFilename())
+                    # A missing trace is indexed as an empty one, which is not stored.
+                    if os.path.exists(self.getFilename()):
+                        try:
+                            il.write_sidecar(index, self.getFilename())
+                        except (IOError, OSError) as e:
+                            logging.error("Could not write sidecar of trace %s: %s" % (self.getFilename(), repr(e)))
+                self.cache["index"] = index
+            return self.cache["index"]
+
+    def __getJumps(self, options):
+        """
+        Returns the blocks of the trace. With `--mmapTraces` the blocks
+        are sliced from a memory mapping of the trace on access, otherwise
+        the code of every block is read into memory.
+        """
+        with self.index_lock:
+            if "jumps" not in self.cache:
+                index = self.__getIndex()
+                if options.mmapTraces:
+                    self.cache["jumps"] = index.map_blocks(self.getFilename())
+                else:
+                    self.cache["jumps"] = index.load_blocks(self.getFilename())
+            return self.cache["jumps"]
 
-    def __getJumps(self,asGenerator=True):
-        if "jumps" not in self.cache:
-            jumps = il.find_jumps(self.getFilename(),False)
-            self.cache["jumps"] = jumps
+    def __getFormula(self, options):
+        """
+        Returns the `BranchFormula` of the whole trace. It is translated
+        once, by the first branch asking for it, and shared by the rest.
+        """
+        with self.formula_lock:
+            if "formula" not in self.cache:
+                self.cache["formula"] = OldMethods.create_trace_formula(self.__getJumps(options), self.getFilename(), options)
+            return self.cache["formula"]
 
-        return self.cache["jumps"]
+    def __closeJumps(self):
+        with self.index_lock:
+            jumps = self.cache.pop("jumps", None)
+            if isinstance(jumps, il.MappedBlocks):
+                jumps.close()
 
     def getBblHashes(self):
-        if "hashes" not in self.cache:
-            self.__fillCache()
-        return self.cache["hashes"]
+        return self.__getIndex().hashes
 
     def getInsCounts(self):
-        if "ins_counts" not in self.cache:
-            self.__fillCache()
-        return self.cache["ins_counts"]
+        return self.__getIndex().ins_counts
 
     def __getLibs(self):
-        if "libs" not in self.cache:
-            self.cache["libs"] = il.get_libs(self.getFilename())
-
-        return self.cache["libs"]
+        return self.__getIndex().libs
 
     @staticmethod
-    def __executePin(input_file, output_file, cov_file, logfile, options, timed_call):
+    def __executePin(input_file, output_file, cov_file, logfile, options, timed_call, coverage_only=False):
 
         pin_args = ["-injection", "child",
                     "-t", options.pinTool
@@ -246,29 +421,26 @@ class PinBap(object):
                         "-o", output_file,
                         "-b", cov_file,
                         ] + options.tracerExtra
-        program_args = options.args[:] #Copy
-        stdin_file = None
-
-        if options.inputType == "file":
+        if options.coverageFormat == coverage.BINARY:
+            pintool_args.extend(["-coverage-format", coverage.BINARY])
+        program_args, stdin_file = program_arguments(options, input_file)
+
+        if coverage_only:
+            # Without taint no instructions are logged. The coverage
+            # is complete, the libraries and faults are written as specials.
+            pintool_args.extend(["-taint-track", "false",
+                                 "-specials", output_file + PinBap.SPECIALS_SUFFIX])
+        elif options.inputType == "file":
             pintool_args.extend(["-taint-files", input_file])
-            for idx,arg in enumerate(program_args):
-                if arg == '{}':
-                    program_args[idx] = input_file
-                    break
         elif options.inputType == "stdin":
             pintool_args.extend(["-taint-stdin"])
-            stdin_file = input_file
-        elif options.inputType == "none":
-            pass
-        else:
-            raise NotImplementedError("Argument to --input must either be 'file' or 'stdin'")
 
         cmd = [options.pin] + pin_args + pintool_args + ["--"] + [options.program] + program_args
         #print("Cmd: %s"%" ".join(cmd))
-        _, _, _ = timed_call(cmd, stdin_file, timeout=options.tracerTimeout, save_stdout=False, save_stderr=False)
-        #TODO: Saving STDERR took too much memory for some runs, implement own Popen.communicate() that
-        # only saves parts of STDERR
-        return "<ERROR LOGGING DISABLED SEE pinbap.py>"
+        # Only the end of the output is kept, some runs print too much to keep all of it.
+        _, out, err = timed_call(cmd, stdin_file, timeout=options.tracerTimeout, save_stdout=True, save_stderr=True,
+                                 tail=PinBap.TRACER_OUTPUT_TAIL)
+        return out, err
 
     #returns tuple (new_input, has_changed)
     # new_input is a binary string representing input required to take other path at branch[branch_number]
@@ -276,7 +448,16 @@ class PinBap(object):
     def swapBranch(self, branch_number, options):
         with open(self.getInputFile(), "rb") as in_f:
             prev_input = in_f.read()
-        new_input = OldMethods.create_input_from_il(self.__getJumps(),branch_number,prev_input, options)
+
+        # Branches without a marker in the trace formula, e.g. when
+        # the altered condition was simplified away, fall back
+        # to translating the prefix of the trace.
+        if options.batchPathConditions:
+            formula = self.__getFormula(options)
+            if formula is not None and formula.has_branch(branch_number):
+                return [OldMethods.create_input_from_formula(formula, branch_number, prev_input, options)]
+
+        new_input = OldMethods.create_input_from_il(self.__getJumps(options),branch_number,prev_input, options, self.getFilename())
         return [new_input]
 
     #Must support negative branch numbers!
@@ -286,21 +467,30 @@ class PinBap(object):
 
         if branch_number < 0:
 
-            jumps = self.__getJumps()
-            if type(jumps) == list:
+            jumps = self.__getJumps(options)
+            if isinstance(jumps, OldMethods.indexable):
                 jumplen = len(jumps)
             else:
                 jumplen = sum(1 for i in jumps)
             branch_number = jumplen+branch_number
 
-        return OldMethods.find_unsafe_stack_writes(self.__getJumps,branch_number, prev_input, options)
+        return OldMethods.find_unsafe_stack_writes(lambda: self.__getJumps(options), branch_number, prev_input, options)
+
+    @staticmethod
+    def moveTrace(trace_file, destination):
+        """
+        Moves a trace, and the files belonging to it, to `destination`.
+        """
+        sidecar = il.sidecar_of(trace_file)
+        shutil.move(trace_file, destination)
+        if os.path.exists(sidecar):
+            shutil.move(sidecar, il.sidecar_of(destination))
 
     @staticmethod
-    def _cleanup(files, path='',bintrace=None, cleanup=True):
+    def _cleanup(files, run_directory=None, cleanup=True):
         if cleanup:
-            if bintrace is not None:
-                trace_file_matches = findFiles(path, basename(bintrace))
-                files = files + trace_file_matches
+            if run_directory is not None:
+                shutil.rmtree(run_directory, ignore_errors=True)
 
             for file in files:
                 if os.path.exists(file):
@@ -310,40 +500,77 @@ class PinBap(object):
                         logging.error("Fail to cleanup file %s due to error %s, Ignoring, (see https://bugs.python.org/issue25717 )"%(file,repr(e)))
 
     @staticmethod
-    def executeTracer(input_file, logfile, path, options, statistics):
+    def _cleanupFailed(files, il_file, run_directory, options, coverage_only):
+        """
+        Removes the files of a failed run, unless `--keepFailed` is given.
+        A coverage run writes no `il_file`, so one of the same input is
+        left alone.
+        """
+        if not coverage_only:
+            files = files + [il_file, il.sidecar_of(il_file)]
+        PinBap._cleanup(files, run_directory, not options.keepFailed)
+
+    @staticmethod
+    def executeTracer(input_file, logfile, path, options, statistics, keep_trace=True, coverage_only=False):
         input_filename = os.path.basename(input_file)
-        bintrace = os.path.join(path, input_filename + PinBap.BIN_TRACE_SUFFIX)
-        cov_file = os.path.join(path, input_filename + PinBap.COVERAGE_SUFFIX)
+        # The binary trace is written to a directory of its own, so it is found
+        # and removed without searching the whole working directory.
+        run_directory = tempfile.mkdtemp(prefix=input_filename + ".", suffix=PinBap.RUN_DIRECTORY_SUFFIX, dir=path)
+        bintrace = os.path.join(run_directory, input_filename + PinBap.BIN_TRACE_SUFFIX)
+        if options.coverageFormat == coverage.BINARY:
+            cov_file = os.path.join(path, input_filename + PinBap.BINARY_COVERAGE_SUFFIX)
+        else:
+            cov_file = os.path.join(path, input_filename + PinBap.COVERAGE_SUFFIX)
         il_file = os.path.join(options.traceStorage, os.path.basename(input_file + PinBap.IL_TRACE_SUFFIX))
         try:
-            ret = PinBap._executeTracer(input_file, logfile, path, options, statistics.perf.pin.timed_call, bintrace, cov_file, il_file)
+            ret = PinBap._executeTracer(input_file, logfile, path, options, statistics.perf.pin.timed_call, bintrace, cov_file, il_file, keep_trace, coverage_only)
             if ret.isSuccess():
-                PinBap._cleanup([logfile], path, bintrace, True)
+                PinBap._cleanup([logfile], run_directory, True)
             else:
-                PinBap._cleanup([cov_file, logfile, il_file], path, bintrace, not options.keepFailed)
+                PinBap._cleanupFailed([cov_file, logfile], il_file, run_directory, options, coverage_only)
             return ret
         except Exception as e:
-            PinBap._cleanup([cov_file, logfile, il_file], path, bintrace, not options.keepFailed)
+            PinBap._cleanupFailed([cov_file, logfile], il_file, run_directory, options, coverage_only)
             print("Exception in user code: %s" % repr(e))
             traceback.print_exc(file=sys.stdout)
             logging.error("Exception %s during tracing, ignoring."%repr(e))
             return PinBapError(bintrace, logfile, "", "", "executeTracer crashed with %s"%repr(e))
 
     @staticmethod
-    def _executeTracer(input_file, logfile, path, options, timed_call,bintrace,cov_file,il_file):
+    def executeCoverage(input_file, logfile, path, options, statistics):
+        """
+        Runs the tracer with taint tracking disabled, see `--coverageFirst`.
+        The tracer writes the loaded libraries and the fatal signal as the
+        specials iltrans would lift them to, so the run is indexed without
+        iltrans. That is enough for `getCoverage` and `getSignal`, but not
+        to create inputs.
+        """
+        return PinBap.executeTracer(input_file, logfile, path, options, statistics, coverage_only=True)
+
+    @staticmethod
+    def _executeTracer(input_file, logfile, path, options, timed_call,bintrace,cov_file,il_file,keep_trace=True,coverage_only=False):
         try:
-            err = PinBap.__executePin(input_file,bintrace,cov_file,logfile,options,timed_call)
+            out, err = PinBap.__executePin(input_file,bintrace,cov_file,logfile,options,timed_call,coverage_only)
         except subprocess.CalledProcessError as e:
-            return PinBapError(bintrace, logfile, "", err, "Pin command '%s' crashed unexpectedly. Exception %s"%(" ".join(e.cmd),repr(e)))
-
-
-        trace_file_matches = findFiles(path, basename(bintrace))
+            return PinBapError(bintrace, logfile, "", e.output, "Pin command '%s' crashed unexpectedly. Exception %s"%(" ".join(e.cmd),repr(e)))
+
+        if coverage_only:
+            specials_file = bintrace + PinBap.SPECIALS_SUFFIX
+            if not os.path.exists(specials_file):
+                return PinBapError(bintrace, logfile, out, err,
+                                   "Coverage run on input %s did not write %s" % (input_file, specials_file))
+            return PinBap(specials_file,input_file,True,cov_file,out,err,il.index_file(specials_file))
+
+        # The tracer appends the process id to the name of the trace.
+        run_directory, trace_name = os.path.split(bintrace)
+        trace_file_matches = [os.path.join(run_directory, name) for name in os.listdir(run_directory)
+                              if name.startswith(trace_name)]
         if len(trace_file_matches) == 0:
-            return PinBapError(bintrace, logfile, "", err,
-                               "Could not find any trace file matching {tf} after pin run on input {inp}. Pin stderr: '{err}'".format(
-                    tf=bintrace, err=err, inp=input_file))
+            return PinBapError(bintrace, logfile, out, err,
+                               "Could not find any trace file matching {tf} after pin run on input {inp}".format(
+                    tf=bintrace, inp=input_file))
         elif len(trace_file_matches) != 1:
-            return PinBapError(bintrace, logfile, "", err, "Found too many matching trace files {}".format(bintrace))
+            return PinBapError(bintrace, logfile, out, err, "Found too many matching trace files {}".format(bintrace))
 
 
         trace_file = trace_file_matches[0]
@@ -358,13 +585,40 @@ class PinBap(object):
             return PinBapError(bintrace, logfile, None, None,
                                "Cannot convert tracefile %s to %s as il file already exists." % (trace_file,il_file))
 
+        index = None
         try:
-            il.from_trace(trace_file, il_file, options.bap)
+            if options.streamTraces:
+                index = PinBap.__streamTrace(trace_file, il_file if keep_trace else None, options)
+            else:
+                il.from_trace(trace_file, il_file, options.bap)
         except subprocess.CalledProcessError as e:
             return PinBapError(bintrace, logfile, e.output, None, "Failed to convert trace %s to il output %s. Iltrans command '%s' crashed. Reason: %s" % (trace_file, il_file, " ".join(e.cmd),repr(e)))
 
-        if not os.path.isfile(il_file):
-            return PinBapError(bintrace, logfile, "", err, "Failed to convert trace %s to il. Iltrans did not crash." % trace_file)
+        if index is None and not os.path.isfile(il_file):
+            return PinBapError(bintrace, logfile, out, err, "Failed to convert trace %s to il. Iltrans did not crash." % trace_file)
 
-        return PinBap(il_file,input_file,True,cov_file,"",err)
+        return PinBap(il_file,input_file,True,cov_file,out,err,index)
+
+    @staticmethod
+    def __streamTrace(trace_file, il_file, options):
+        """
+        Lifts the trace with the IL written to a pipe, and indexes the
+        lines while iltrans produces them. The lines are copied to
+        `il_file` along with its sidecar, unless `il_file` is `None`,
+        in which case the IL never touches the disk.
+        """
+        def consume(stream):
+            if il_file is None:
+                return il.index_stream(stream)
+            with open(il_file, "w") as copy:
+                return il.index_stream(stream, copy)
+
+        index = il.from_trace_stream(trace_file, consume, options.bap)
+
+        if il_file is not None:
+            try:
+                il.write_sidecar(index, il_file)
+            except (IOError, OSError) as e:
+                logging.error("Could not write sidecar of trace %s: %s" % (il_file, repr(e)))
+        return index
 
@@ -0,0 +1,146 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+A cache of solver results, keyed by the normalized path condition.
+
+Traces of sibling inputs share long prefixes, so the same path
+condition is often solved many times, only with the variables named
+differently by the translation. `query_key` normalizes the formula
+before hashing it, and the `QueryCache` maps the key to the output of
+the solver, which holds either a counterexample or the UNSAT result
+(`Valid.`).
+
+The most recently used results are kept in memory. If a directory is
+given, results are also stored there, one file per key, so that they
+survive `--resume`.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+SUFFIX = ".sol"
+
+# Variables renamed by the translation, e.g. `R_EAX_1234` or `symb_1_43`.
+# The prefix is kept, since `symb_<n>` names the input byte.
+renamed_variable = re.compile(r"\b([A-Za-z]\w*?)_(\d+)\b")
+comment = re.compile(r"%[^\n]*")
+whitespace = re.compile(r"\s+")
+
+
+def normalize(query):
+    """
+    Normalizes the CVC Lite `query` by removing comments and
+    redundant whitespace, and by numbering the renamed variables
+    in the order they first appear.
+
+        >>> normalize("x_12 : BITVECTOR(8); % x\\nASSERT( x_12 = symb_1_40 );")
+        'x_0 : BITVECTOR(8); ASSERT( x_0 = symb_1_1 );'
+    """
+    names = {}
+
+    def rename(match):
+        name = match.group(0)
+        if name not in names:
+            names[name] = "%s_%d" % (match.group(1), len(names))
+        return names[name]
+
+    query = whitespace.sub(" ", comment.sub("", query)).strip()
+    return renamed_variable.sub(rename, query)
+
+
+def query_key(query):
+    return hashlib.sha1(normalize(query).encode("utf-8")).hexdigest()
+
+
+class QueryCache(object):
+    """
+    QueryCache
+    ==========
+
+    Maps query keys to solver output. At most `capacity` results
+    are kept in memory, evicting the least recently used. If
+    `directory` is given, every result is also stored on disk.
+    """
+    # Relative to the work directory, to be kept when resuming.
+    DIRECTORY = "solver_cache"
+
+    def __init__(self, capacity, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        """
+        Returns the stored solver output for `key`, otherwise `None`.
+        """
+        with self.lock:
+            if key in self.results:
+                solution = self.results.pop(key)
+                self.results[key] = solution
+                return solution
+
+        solution = self.load(key)
+        if solution is not None:
+            self.remember(key, solution)
+        return solution
+
+    def put(self, key, solution):
+        self.remember(key, solution)
+        self.store(key, solution)
+
+    def remember(self, key, solution):
+        with self.lock:
+            self.results.pop(key, None)
+            self.results[key] = solution
+            while len(self.results) > self.capacity:
+                self.results.popitem(last=False)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except IOError:
+            return None
+
+    def store(self, key, solution):
+        if self.directory is None:
+            return
+
+        # Write to a temporary name first, other threads may read the key.
+        temp_path = "%s.%d.tmp" % (self.path(key), threading.current_thread().ident)
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(solution)
+            os.rename(temp_path, self.path(key))
+        except (IOError, OSError) as e:
+            logging.error("Could not store solver result %s: %s" % (key, repr(e)))
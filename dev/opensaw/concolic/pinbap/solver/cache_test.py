@@ -0,0 +1,90 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import subprocess
+
+from opensaw.concolic.pinbap.solver import cvc
+from opensaw.concolic.pinbap.solver.cache import QueryCache, query_key
+from opensaw.statistics.performance import Performance
+
+query = """
+R_EAX_120 : BITVECTOR(32);
+symb_1_43 : BITVECTOR(8);
+ASSERT( R_EAX_120 = (0bin000000000000000000000000 @ symb_1_43) );
+QUERY(FALSE);
+"""
+
+# The same query, translated from another trace.
+renamed_query = """
+R_EAX_7 : BITVECTOR(32);
+symb_1_9 : BITVECTOR(8);  % A comment
+ASSERT( R_EAX_7 =   (0bin000000000000000000000000 @ symb_1_9) );
+QUERY(FALSE);
+"""
+
+
+def test_query_key():
+    assert query_key(query) == query_key(renamed_query)
+    # The input byte is part of the key.
+    assert query_key(query) != query_key(query.replace("symb_1_", "symb_2_"))
+
+
+def test_lru():
+    cache = QueryCache(2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+
+    # "b" was the least recently used.
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert len(cache) == 2
+
+
+def test_persistent(tmpdir):
+    directory = tmpdir.join("cache").strpath
+    QueryCache(1, directory).put("a", "Valid.\n")
+
+    # A new cache, e.g. after resuming, finds the stored result.
+    assert QueryCache(1, directory).get("a") == "Valid.\n"
+
+
+class Pool(object):
+    def __init__(self):
+        self.queries = []
+
+    def solve(self, query, timeout=0):
+        self.queries.append(query)
+        return "ASSERT( symb_1_43 = 0x62 );\nInvalid.\n"
+
+
+def test_solve_query():
+    perf = Performance()
+    pool = Pool()
+    cvc.set_subprocess(perf)
+    cvc.set_pool(pool)
+    cvc.set_cache(QueryCache(10))
+    try:
+        assert cvc.solve_query(query) == cvc.solve_query(renamed_query)
+        assert len(pool.queries) == 1
+        assert perf.counters == {"cache_hits": 1, "cache_misses": 1}
+    finally:
+        cvc.set_pool(None)
+        cvc.set_cache(None)
+        cvc.set_subprocess(subprocess)
@@ -20,10 +20,25 @@ The CVC module contains functions manipulating the CVC Lite format.
 This is done through the external tool [`STP`](http://stp.github.io/).
 """
 
+import os
 import subprocess
+import tempfile
+
+from opensaw.concolic.pinbap.solver.cache import query_key
+from opensaw.concolic.pinbap.solver.pool import SolverTimeout
+from opensaw.concolic.pinbap.solver.slicing import slice_query
 
 extension = ".cvc"
 
+# The `pool.SolverPool` solving path conditions, if any.
+pool = None
+
+# The `cache.QueryCache` of solver results, if any.
+cache = None
+
+# Whether independent constraints are sliced away before solving.
+slicing = False
+
 
 # TODO: Do not override subprocess module, use correct module from start
 def set_subprocess(p):
@@ -37,6 +52,39 @@ def set_subprocess(p):
     subprocess = p
 
 
+def set_pool(p):
+    """
+    Solves path conditions through the `pool.SolverPool` `p`,
+    instead of a new process for every path condition.
+    """
+    global pool
+    pool = p
+
+
+def set_cache(c):
+    """
+    Looks up path conditions in the `cache.QueryCache` `c`
+    before solving them.
+    """
+    global cache
+    cache = c
+
+
+def set_slicing(enabled):
+    """
+    Removes the constraints independent of the altered branch
+    from path conditions before solving them, see `slicing`.
+    """
+    global slicing
+    slicing = enabled
+
+
+def count(name, n=1):
+    # Counters are only available when measured by `Performance`.
+    if hasattr(subprocess, "count"):
+        subprocess.count(name, n)
+
+
 def new_input_from_path_condition(old_input, pc_file, timeout=0):
     return new_input_from_solution(old_input,
                                    solve_path_condition(pc_file, timeout=timeout))
@@ -46,9 +94,77 @@ def solve_path_condition(pc_file, timeout=0):
     """
     Invokes STP to solve the given Path Condition named `pc_file`.
     """
+    if pool is not None or cache is not None or slicing:
+        with open(pc_file) as f:
+            return solve_query(f.read(), timeout=timeout)
+
+    return run_stp(pc_file, timeout=timeout)
+
+
+def run_stp(pc_file, timeout=0):
     return subprocess.check_output(["stp", pc_file], timeout=timeout, save_stdout=True,save_stderr=False)[0]
 
 
+def solve_query(query, timeout=0):
+    """
+    Solves the path condition `query`. The query is sliced, if enabled,
+    and looked up in the cache before it is solved through the solver
+    pool, if any.
+    """
+    if slicing:
+        sliced, kept, total = slice_query(query)
+        count("constraints", total)
+        count("constraints_kept", kept)
+        count("formula_bytes", len(query))
+        count("formula_bytes_kept", len(sliced))
+        query = sliced
+
+    key = None
+    if cache is not None:
+        key = query_key(query)
+        solution = cache.get(key)
+        if solution is not None:
+            count("cache_hits")
+            return solution
+        count("cache_misses")
+
+    if pool is not None:
+        solution = solve_in_pool(query, timeout=timeout)
+    else:
+        solution = solve_in_file(query, timeout=timeout)
+
+    if key is not None:
+        cache.put(key, solution)
+    return solution
+
+
+def solve_in_pool(query, timeout=0):
+    try:
+        return pool.solve(query, timeout=timeout)
+    except SolverTimeout:
+        count("timeouts")
+        raise
+
+
+def report_pool_usage(cpu_time, wall):
+    """
+    Reports a query solved by the pool, see `pool.SolverPool`. Only the
+    CPU- and wall-clock time of the long-lived solvers are measured.
+    """
+    if hasattr(subprocess, "report_wall"):
+        subprocess.report_wall(wall, cpu_time)
+
+
+def solve_in_file(query, timeout=0):
+    f = tempfile.NamedTemporaryFile(suffix=extension, dir=".", delete=False)
+    try:
+        with f:
+            f.write(query)
+        return run_stp(f.name, timeout=timeout)
+    finally:
+        os.unlink(f.name)
+
+
 def new_input_from_solution(old_input, solution):
     """
     Given an input string and a CVC solution string,
@@ -0,0 +1,154 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+Splitting of CVC Lite formulas into per-branch queries.
+
+A trace formula generated from an `.il` trace where the altered
+condition of every branch is assigned to a marker variable, see
+`il.write_marked_code`, contains the path condition of every prefix
+of the trace. The query for branch `k` is the prefix of the formula
+up to the definition of marker `k`, asserting that the marker does
+not hold, i.e. that the branch is taken the other way.
+"""
+import re
+
+QUERY = "QUERY(FALSE);\nCOUNTEREXAMPLE;\n"
+
+declaration = re.compile(r"^\s*(\w+)\s*:\s*(BITVECTOR|BOOLEAN|ARRAY)")
+# A declaration with a body, e.g. `t : BITVECTOR(8) = x;`
+definition = re.compile(r"^\s*\w+\s*:[^=]*=")
+special_characters = re.compile(r"[();%\n]")
+
+
+def statements(text):
+    """
+    Splits a CVC Lite formula into its top level statements,
+    dropping `%` comments.
+
+        >>> statements("x : BITVECTOR(8); % A comment\\nASSERT( (x = 0x01) );")
+        ['x : BITVECTOR(8);', 'ASSERT( (x = 0x01) );']
+    """
+    result = []
+    depth = 0
+    start = 0
+    in_comment = False
+    parts = []
+
+    for match in special_characters.finditer(text):
+        char = match.group()
+        if in_comment:
+            if char == "\n":
+                in_comment = False
+                start = match.end()
+            continue
+
+        if char == "%":
+            parts.append(text[start:match.start()])
+            in_comment = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == ";" and depth == 0:
+            parts.append(text[start:match.end()])
+            statement = "".join(parts).strip()
+            if statement != ";":
+                result.append(statement)
+            parts = []
+            start = match.end()
+
+    return result
+
+
+class BranchFormula(object):
+    """
+    BranchFormula
+    =============
+
+    A trace formula containing marker variables named `<prefix><k>`,
+    possibly suffixed by `_<n>` when the variables are renamed.
+    Only the declarations and the statements of the formula are kept,
+    the queries are assembled when written.
+    """
+
+    def __init__(self, text, prefix):
+        self.declarations = []
+        self.statements = []
+        self.types = {}
+        self.markers = {}
+
+        marker = re.compile(r"\b(%s(\d+)(?:_\d+)?)\b" % re.escape(prefix))
+
+        for statement in statements(text):
+            match = declaration.match(statement)
+            if match:
+                self.types[match.group(1)] = match.group(2)
+                if not definition.match(statement):
+                    self.declarations.append(statement)
+                    continue
+            if statement.startswith(("QUERY", "COUNTEREXAMPLE")):
+                continue
+
+            self.statements.append(statement)
+            for match in marker.finditer(statement):
+                branch = int(match.group(2))
+                # The first statement using a marker defines it.
+                if branch not in self.markers:
+                    self.markers[branch] = match.group(1), len(self.statements)
+
+    def has_branch(self, k):
+        return k in self.markers
+
+    def is_splittable(self):
+        """
+        Returns whether every marker is defined by a statement of its
+        own. When the translation nests the whole trace into a single
+        `LET` expression, a prefix would contain the path condition
+        after the branch as well, so the formula cannot be split.
+
+            >>> BranchFormula("ASSERT( LET b_0 = 0bin1, b_1 = 0bin0 IN b_0 = b_1 );", "b_").is_splittable()
+            False
+        """
+        ends = set(end for _, end in self.markers.values())
+        return len(ends) == len(self.markers)
+
+    def query(self, k):
+        """
+        Returns the query for altering branch `k`.
+
+            >>> formula = BranchFormula("b_0_1 : BITVECTOR(1);"
+            ...                         "ASSERT( b_0_1 = 0bin1 );", "b_")
+            >>> print(formula.query(0))
+            b_0_1 : BITVECTOR(1);
+            ASSERT( b_0_1 = 0bin1 );
+            ASSERT( b_0_1 = 0bin0 );
+            QUERY(FALSE);
+            COUNTEREXAMPLE;
+            <BLANKLINE>
+        """
+        name, end = self.markers[k]
+
+        if self.types.get(name) == "BOOLEAN":
+            assertion = "ASSERT( NOT %s );" % name
+        else:
+            assertion = "ASSERT( %s = 0bin0 );" % name
+
+        return "\n".join(self.declarations + self.statements[:end] + [assertion, QUERY])
+
+    def write_query(self, k, file):
+        file.write(self.query(k))
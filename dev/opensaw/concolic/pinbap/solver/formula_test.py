@@ -0,0 +1,81 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from opensaw.concolic.pinbap.solver.formula import BranchFormula, statements
+
+formula = """
+symb_1_1 : BITVECTOR(8);
+opensaw_branch_0_12 : BITVECTOR(1);
+opensaw_branch_2_40 : BITVECTOR(1);
+% Comment containing a ; and a (
+ASSERT( (opensaw_branch_0_12 = IF (symb_1_1 = 0x62) THEN 0bin1 ELSE 0bin0 ENDIF) );
+ASSERT( (symb_1_1 = 0x61) );
+ASSERT( (opensaw_branch_2_40 = IF (symb_1_1 = 0x63) THEN 0bin1 ELSE 0bin0 ENDIF) );
+QUERY(FALSE);
+COUNTEREXAMPLE;
+"""
+
+
+def test_statements():
+    assert len(statements(formula)) == 8
+
+
+def test_branch_formula():
+    branch_formula = BranchFormula(formula, "opensaw_branch_")
+
+    assert branch_formula.has_branch(0)
+    assert not branch_formula.has_branch(1)
+    assert branch_formula.has_branch(2)
+
+    query = branch_formula.query(0)
+    # The path condition after the marker is cut away.
+    assert "0x61" not in query
+    # The marker holds for the current input, the query negates it.
+    assert query.endswith("ASSERT( opensaw_branch_0_12 = 0bin0 );\nQUERY(FALSE);\nCOUNTEREXAMPLE;\n")
+
+    query = branch_formula.query(2)
+    assert "0x61" in query
+    assert "opensaw_branch_2_40 : BITVECTOR(1);" in query
+    assert query.count("QUERY") == 1
+
+
+def test_boolean_marker_is_negated():
+    branch_formula = BranchFormula("opensaw_branch_0 : BOOLEAN;\n"
+                                   "ASSERT( opensaw_branch_0 <=> TRUE );", "opensaw_branch_")
+
+    assert branch_formula.query(0).endswith("ASSERT( NOT opensaw_branch_0 );\nQUERY(FALSE);\nCOUNTEREXAMPLE;\n")
+
+
+def test_nested_formula_is_not_splittable():
+    assert BranchFormula(formula, "opensaw_branch_").is_splittable()
+
+    nested = """
+symb_1_1 : BITVECTOR(8);
+ASSERT( LET opensaw_branch_0_12 = IF (symb_1_1 = 0x62) THEN 0bin1 ELSE 0bin0 ENDIF IN
+        LET opensaw_branch_2_40 = IF (symb_1_1 = 0x63) THEN 0bin1 ELSE 0bin0 ENDIF IN
+        (symb_1_1 = 0x61) );
+"""
+    assert not BranchFormula(nested, "opensaw_branch_").is_splittable()
+
+
+def test_typed_definition_marker():
+    branch_formula = BranchFormula("symb_1_1 : BITVECTOR(8);\n"
+                                   "opensaw_branch_0 : BITVECTOR(1) = IF (symb_1_1 = 0x62) THEN 0bin1 ELSE 0bin0 ENDIF;\n"
+                                   "ASSERT( (symb_1_1 = 0x61) );", "opensaw_branch_")
+
+    assert branch_formula.has_branch(0)
+    assert "0x61" not in branch_formula.query(0)
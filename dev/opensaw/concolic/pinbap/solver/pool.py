@@ -0,0 +1,302 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+A pool of solver workers.
+
+Solving a path condition with `cvc.solve_path_condition` starts a new
+process, wrapped in `/usr/bin/time`, for every query, and passes the
+query through a file. The `SolverPool` keeps `size` solver backends,
+each solving one query at a time, and passes queries over pipes.
+
+A backend implements the `Backend` interface:
+
+- `PipeBackend` keeps a long-lived process, which reads queries
+  followed by a separator line from its stdin, and answers with the
+  solution followed by the same separator on its stdout.
+- `StpBackend` keeps a long-lived `stp` process reading CVC Lite from
+  its stdin. Every query is solved in a `PUSH`/`POP` scope, and is
+  followed by `QUERY(TRUE);`, whose `Valid.` ends the answer. An `stp`
+  which does not answer this way when started, e.g. one buffering its
+  output until its input ends, is replaced by a new `stp` process for
+  every query.
+
+Crashed or timed out backends are restarted. Both raise
+`CalledProcessError`, like `cvc.solve_path_condition`, so callers
+handle a failed query the same way whether a pool is used or not.
+Timed out queries raise the `SolverTimeout` subclass.
+
+The CPU time of every query is measured, from `/proc` for long-lived
+processes, and handed to the `report` function of the pool along with
+its wall-clock time.
+"""
+import logging
+import os
+from subprocess import PIPE, Popen, CalledProcessError
+from time import time
+
+from opensaw.statistics.performance import UsagePopen, wall_timeout
+from opensaw.utils.processgroups import GroupDeadline, kill_group, new_group
+
+try:
+    import queue
+except ImportError:
+    # noinspection PyUnresolvedReferences
+    import Queue as queue
+
+
+def process_cpu_time(pid):
+    """
+    Returns the CPU seconds, user and system, used so far by the
+    running process `pid`, or `None` if it cannot be read.
+    """
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            # The fields after the command, which is in parentheses.
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / float(os.sysconf("SC_CLK_TCK"))
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+class SolverTimeout(CalledProcessError):
+    pass
+
+
+class Backend(object):
+    """
+    The interface of the backends of a `SolverPool`.
+    A backend is used by a single thread at a time.
+    """
+
+    # The CPU seconds used by the last query, or `None` if unknown.
+    cpu_time = None
+
+    def solve(self, query, timeout=0):
+        """
+        Returns the solution of the CVC Lite `query` as a string.
+        Raises `CalledProcessError` if the solver crashed or
+        did not answer within `timeout` seconds.
+        """
+        raise NotImplementedError
+
+    def restart(self):
+        """
+        Discards the state of the backend, called after a failed query.
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class PipeBackend(Backend):
+    """
+    Keeps a long-lived solver process, started by `cmd`, answering
+    queries separated by `separator` lines on its stdin and stdout.
+    A query which is not answered within `wall_timeout(timeout)`
+    seconds stops the process group of the solver.
+    """
+
+    def __init__(self, cmd, separator="% END"):
+        self.cmd = cmd
+        self.separator = separator
+        self.process = None
+
+    def start(self):
+        self.process = Popen(self.cmd, stdin=PIPE, stdout=PIPE, close_fds=True, preexec_fn=new_group())
+
+    def frame(self, query):
+        """
+        Returns the input passing `query` to the solver.
+        """
+        return "%s\n%s\n" % (query.rstrip("\n"), self.separator)
+
+    def read_answer(self, stdout, lines):
+        """
+        Reads the lines of an answer from `stdout` into `lines`.
+        Returns `False` if the solver exited before answering.
+        """
+        for line in iter(stdout.readline, ""):
+            if line.rstrip("\n") == self.separator:
+                return True
+            lines.append(line)
+        return False
+
+    def exchange(self, query, timeout):
+        """
+        Passes `query` to the running solver. Returns whether it was
+        answered, the lines of the answer and whether the deadline expired.
+        """
+        process = self.process
+        lines = []
+        before = process_cpu_time(process.pid)
+        deadline = GroupDeadline(process.pid, wall_timeout(timeout))
+        try:
+            process.stdin.write(self.frame(query))
+            process.stdin.flush()
+            answered = self.read_answer(process.stdout, lines)
+        except (IOError, OSError) as e:
+            logging.error("Lost solver %s: %s" % (" ".join(self.cmd), repr(e)))
+            answered = False
+        finally:
+            deadline.cancel()
+
+        after = process_cpu_time(process.pid)
+        self.cpu_time = None if before is None or after is None else after - before
+        return answered, lines, deadline.expired
+
+    def solve(self, query, timeout=0):
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+
+        answered, lines, expired = self.exchange(query, timeout)
+        if answered:
+            return "".join(lines)
+
+        # The solver exited, or was stopped by the deadline, before answering.
+        returncode = self.process.poll()
+        self.restart()
+        if expired:
+            raise SolverTimeout(returncode, self.cmd, "".join(lines))
+        raise CalledProcessError(returncode, self.cmd, "".join(lines))
+
+    def restart(self):
+        # A new process is started by the next query.
+        self.close()
+
+    def close(self):
+        if self.process is None:
+            return
+
+        if self.process.poll() is None:
+            kill_group(self.process.pid)
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+        self.process = None
+
+
+class StpBackend(PipeBackend):
+    """
+    Keeps a long-lived `stp` process, see the module documentation.
+    Falls back to a new `stp` process for every query when a started
+    `stp` does not answer the `PROBE` twice, each within
+    `wall_timeout(PROBE_TIMEOUT)` seconds.
+    """
+
+    RESULTS = ("Valid.", "Invalid.")
+
+    # Declares the same variable in two scopes, as consecutive queries do.
+    PROBE = "opensaw_probe : BITVECTOR(8);\nQUERY(TRUE);\n"
+    PROBE_TIMEOUT = 5
+
+    def __init__(self, stp="stp"):
+        PipeBackend.__init__(self, [stp])
+        self.persistent = True
+
+    def frame(self, query):
+        return "PUSH;\n%s\nPOP;\nQUERY(TRUE);\n" % query.rstrip("\n")
+
+    def read_answer(self, stdout, lines):
+        # The result of the query is kept, the one of `QUERY(TRUE);` ends it.
+        results = 0
+        for line in iter(stdout.readline, ""):
+            if line.strip() in self.RESULTS:
+                results += 1
+                if results == 2:
+                    return True
+            lines.append(line)
+        return False
+
+    def start(self):
+        PipeBackend.start(self)
+        for _ in range(2):
+            answered, _, _ = self.exchange(self.PROBE, self.PROBE_TIMEOUT)
+            if not answered:
+                logging.warning("%s cannot be kept running between queries, "
+                                "starting it for every query instead" % " ".join(self.cmd))
+                self.close()
+                self.persistent = False
+                return
+
+    def solve(self, query, timeout=0):
+        if self.persistent and (self.process is None or self.process.poll() is not None):
+            self.start()
+        if self.persistent:
+            return PipeBackend.solve(self, query, timeout)
+        return self.solve_once(query, timeout)
+
+    def solve_once(self, query, timeout):
+        """
+        Solves `query` by a new `stp` process, limited in CPU and
+        wall-clock time like `Performance.timed_call`.
+        """
+        process = UsagePopen(self.cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE, close_fds=True,
+                             preexec_fn=new_group(timeout))
+        deadline = GroupDeadline(process.pid, wall_timeout(timeout))
+        try:
+            out, err = process.communicate(query)
+        finally:
+            deadline.cancel()
+
+        usage = process.rusage
+        self.cpu_time = None if usage is None else usage.ru_utime + usage.ru_stime
+        if deadline.expired:
+            raise SolverTimeout(process.returncode, self.cmd, "%s \n %s" % (out, err))
+        if process.returncode:
+            raise CalledProcessError(process.returncode, self.cmd, "%s \n %s" % (out, err))
+
+        return out
+
+
+class SolverPool(object):
+    """
+    SolverPool
+    ==========
+
+    Hands out the backends created by `factory` to the threads solving
+    queries. A thread blocks until one of the `size` backends is free.
+    After every query, `report` is called with the CPU seconds used by
+    the solver, or `None` if unknown, and the wall-clock seconds.
+    """
+
+    def __init__(self, factory, size, report=None):
+        self.report = report
+        self.backends = queue.Queue()
+        for _ in range(max(1, size)):
+            self.backends.put(factory())
+
+    def solve(self, query, timeout=0):
+        backend = self.backends.get()
+        start = time()
+        backend.cpu_time = None
+        try:
+            return backend.solve(query, timeout)
+        finally:
+            cpu_time = backend.cpu_time
+            self.backends.put(backend)
+            if self.report is not None:
+                self.report(cpu_time, time() - start)
+
+    def close(self):
+        while True:
+            try:
+                backend = self.backends.get_nowait()
+            except queue.Empty:
+                return
+            backend.close()
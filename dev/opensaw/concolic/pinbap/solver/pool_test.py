@@ -0,0 +1,145 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import os
+import sys
+from subprocess import CalledProcessError
+
+import pytest
+
+from opensaw.concolic.pinbap.solver.cvc import new_input_from_solution
+from opensaw.concolic.pinbap.solver.pool import Backend, PipeBackend, SolverPool, StpBackend
+
+# A stand-in for a long-lived solver. Answers every query with the
+# number of queries it has answered, crashes or hangs on request.
+stub_solver = """
+import sys, time
+answered = 0
+query = []
+for line in iter(sys.stdin.readline, ""):
+    if line.rstrip("\\n") != "% END":
+        query.append(line)
+        continue
+    if "crash" in "".join(query):
+        sys.exit(1)
+    if "hang" in "".join(query):
+        time.sleep(60)
+    answered += 1
+    sys.stdout.write("ASSERT( symb_1_ = 0x%x );\\n%% END\\n" % (0x60 + answered))
+    sys.stdout.flush()
+    query = []
+"""
+
+
+def test_pipe_backend():
+    backend = PipeBackend([sys.executable, "-c", stub_solver])
+    try:
+        assert "0x61" in backend.solve("QUERY(FALSE);")
+        # The same process answers the next query.
+        assert new_input_from_solution("a", backend.solve("QUERY(FALSE);")) == ("b", True)
+
+        with pytest.raises(CalledProcessError):
+            backend.solve("crash")
+        # A new process is started after a crash.
+        assert "0x61" in backend.solve("QUERY(FALSE);")
+
+        with pytest.raises(CalledProcessError):
+            backend.solve("hang", timeout=1)
+        assert "0x61" in backend.solve("QUERY(FALSE);")
+    finally:
+        backend.close()
+
+
+# A stand-in for `stp` reading CVC Lite from stdin. Answers every query
+# with the process id and the number of scopes it has seen.
+stub_stp = """
+import os, sys
+scopes = 0
+for line in iter(sys.stdin.readline, ""):
+    if line.startswith("PUSH;"):
+        scopes += 1
+    elif line.startswith("QUERY(TRUE);"):
+        sys.stdout.write("Valid.\\n")
+    elif line.startswith("QUERY(FALSE);"):
+        sys.stdout.write("Invalid.\\n")
+    elif line.startswith("COUNTEREXAMPLE;"):
+        sys.stdout.write("ASSERT( symb_1_ = 0x%x );\\n" % scopes)
+        sys.stdout.write("ASSERT( pid = %d );\\n" % os.getpid())
+    sys.stdout.flush()
+"""
+
+# An `stp` which only answers when its input ends.
+stub_stp_once = """
+import sys
+if "QUERY(FALSE);" in sys.stdin.read():
+    sys.stdout.write("Invalid.\\nASSERT( symb_1_ = 0x62 );\\n")
+"""
+
+
+def stp_script(tmpdir, source):
+    path = tmpdir.join("stp")
+    path.write("#!%s\n%s" % (sys.executable, source))
+    os.chmod(str(path), 0o755)
+    return str(path)
+
+
+def test_stp_backend(tmpdir):
+    backend = StpBackend(stp_script(tmpdir, stub_stp))
+    try:
+        first = backend.solve("QUERY(FALSE);\nCOUNTEREXAMPLE;")
+        assert first.startswith("Invalid.\n")
+        assert backend.cpu_time is not None
+        # The same process answers the next query, after the probes.
+        second = backend.solve("QUERY(FALSE);\nCOUNTEREXAMPLE;")
+        assert second.split("\n")[2] == first.split("\n")[2]
+        assert new_input_from_solution("a", second) == ("\x04", True)
+        assert backend.solve("QUERY(TRUE);") == "Valid.\n"
+    finally:
+        backend.close()
+
+
+def test_stp_backend_once(tmpdir, monkeypatch):
+    monkeypatch.setattr(StpBackend, "PROBE_TIMEOUT", 0.5)
+    backend = StpBackend(stp_script(tmpdir, stub_stp_once))
+    try:
+        assert new_input_from_solution("a", backend.solve("QUERY(FALSE);")) == ("b", True)
+        assert not backend.persistent
+        assert backend.cpu_time is not None
+        assert new_input_from_solution("a", backend.solve("QUERY(FALSE);")) == ("b", True)
+    finally:
+        backend.close()
+
+
+class CountingBackend(Backend):
+    created = 0
+
+    def __init__(self):
+        CountingBackend.created += 1
+
+    def solve(self, query, timeout=0):
+        self.cpu_time = 0.5
+        return query.upper()
+
+
+def test_solver_pool():
+    reports = []
+    pool = SolverPool(CountingBackend, 3, report=lambda cpu_time, wall: reports.append(cpu_time))
+    assert CountingBackend.created == 3
+    assert pool.solve("query") == "QUERY"
+    assert reports == [0.5]
+    assert pool.backends.qsize() == 3
+    pool.close()
@@ -0,0 +1,118 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+Constraint independence slicing of path conditions, as done by KLEE.
+
+The last assertion of a path condition is the condition of the altered
+branch. Only the assertions sharing variables with it, directly or
+through other assertions or definitions, can restrict its solution.
+The remaining
+assertions are satisfied by the previous input, which keeps its
+values for the bytes not in the solution, see
+`cvc.new_input_from_solution`. They are removed before solving.
+"""
+import re
+
+from opensaw.concolic.pinbap.solver.formula import declaration, statements
+
+identifier = re.compile(r"\b[A-Za-z_]\w*\b")
+
+
+class Variables(object):
+    """
+    A union-find of variables, joining the variables
+    of every assertion into the same set.
+    """
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, variable):
+        root = variable
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+
+        # Compress the path to the root.
+        while variable != root:
+            self.parent[variable], variable = root, self.parent[variable]
+
+        return root
+
+    def join(self, variables):
+        roots = [self.find(variable) for variable in variables]
+        for root in roots[1:]:
+            self.parent[root] = roots[0]
+
+
+def slice_query(query):
+    """
+    Returns the `query` without the assertions independent of its
+    last assertion, the number of assertions kept, and the number of
+    assertions in `query`.
+
+        >>> sliced, kept, total = slice_query(
+        ...     "a : BITVECTOR(8); b : BITVECTOR(8); c : BITVECTOR(8);"
+        ...     "ASSERT( a = 0x01 ); ASSERT( b = c ); ASSERT( c = 0x02 );"
+        ...     "QUERY(FALSE);")
+        >>> print(sliced)
+        b : BITVECTOR(8);
+        c : BITVECTOR(8);
+        ASSERT( b = c );
+        ASSERT( c = 0x02 );
+        QUERY(FALSE);
+        >>> kept, total
+        (2, 3)
+    """
+    declared = set()
+    constraints = []
+    rest = []
+
+    for statement in statements(query):
+        match = declaration.match(statement)
+        if match:
+            declared.add(match.group(1))
+        elif not statement.startswith("ASSERT"):
+            rest.append(statement)
+            continue
+
+        # A typed definition joins the defined name with the
+        # variables of its body, like an assertion would.
+        variables = set(name for name in identifier.findall(statement) if name in declared)
+        constraints.append((statement, variables, match is None))
+
+    assertions = [constraint for constraint in constraints if constraint[2]]
+    if not assertions:
+        return query, 0, 0
+
+    components = Variables()
+    for _, variables, _ in constraints:
+        components.join(list(variables))
+
+    last, target, _ = assertions[-1]
+    roots = set(components.find(variable) for variable in target)
+
+    if target:
+        kept = [(statement, is_assertion) for statement, variables, is_assertion in constraints
+                if variables and components.find(next(iter(variables))) in roots]
+    else:
+        # A constant condition does not depend on any other assertion.
+        kept = [(last, True)]
+
+    lines = [statement for statement, _ in kept] + rest
+
+    return "\n".join(lines), sum(1 for _, is_assertion in kept if is_assertion), len(assertions)
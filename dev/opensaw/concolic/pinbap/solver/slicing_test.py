@@ -0,0 +1,67 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from opensaw.concolic.pinbap.solver.cvc import new_input_from_solution
+from opensaw.concolic.pinbap.solver.slicing import slice_query
+
+# The altered branch depends on the first two input bytes,
+# the third byte was only compared earlier in the trace.
+query = """
+symb_1_1 : BITVECTOR(8);
+symb_2_2 : BITVECTOR(8);
+symb_3_3 : BITVECTOR(8);
+T_4 : BITVECTOR(8);
+ASSERT( symb_3_3 = 0x7a );
+ASSERT( T_4 = BVPLUS(8, symb_1_1, 0x01) );
+ASSERT( symb_2_2 = 0x6f );
+ASSERT( T_4 = symb_2_2 );
+QUERY(FALSE);
+COUNTEREXAMPLE;
+"""
+
+
+def test_slice_query():
+    sliced, kept, total = slice_query(query)
+    assert (kept, total) == (3, 4)
+    assert "symb_3_3" not in sliced
+    assert sliced.endswith("QUERY(FALSE);\nCOUNTEREXAMPLE;")
+
+    # Bytes not in the solution keep their previous values.
+    solution = "ASSERT( symb_1_1 = 0x6e );\nASSERT( symb_2_2 = 0x6f );\n"
+    assert new_input_from_solution("abz", solution) == ("noz", True)
+
+
+def test_slice_without_assertions():
+    assert slice_query("QUERY(FALSE);") == ("QUERY(FALSE);", 0, 0)
+
+
+def test_slice_through_definitions():
+    # The altered branch only uses t_3, defined from the first byte.
+    sliced, kept, total = slice_query("""
+symb_1_1 : BITVECTOR(8);
+symb_2_2 : BITVECTOR(8);
+t_3 : BITVECTOR(8) = symb_1_1;
+ASSERT( LET t_4 = BVPLUS(8, symb_2_2, 0x01) IN t_4 = 0x43 );
+ASSERT( symb_1_1 = 0x42 );
+ASSERT( t_3 = 0x41 );
+QUERY(FALSE);
+""")
+    assert (kept, total) == (2, 3)
+    assert "t_3 : BITVECTOR(8) = symb_1_1;" in sliced
+    assert "ASSERT( symb_1_1 = 0x42 );" in sliced
+    assert "ASSERT( t_3 = 0x41 );" in sliced
+    assert "symb_2_2" not in sliced
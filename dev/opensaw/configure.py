@@ -88,13 +88,39 @@ def parse_arguments(program, arguments):
     parser.add_argument("--discardOverflow",
                         default=False,
                         action="store_true",
-                        help="When using --maxTraceQueue and queue is full do not block pin thread, instead drop last trace on queue.")
+                        help="When using --maxTraceQueue and queue is full do not block pin thread, instead drop the trace with "
+                             "the lowest priority on queue.")
 
     parser.add_argument("--reanalyzeTraces",
                         default=False,
                         action="store_true",
-                        help="The trace queue from pin to bap can become large. Instead of keeping nodes in memory, reanalyze them"
-                             "when they are being handled by bap.")
+                        help="Kept for compatibility. Queued traces are always reanalyzed from their .ilx index when they "
+                             "are handled by bap, instead of keeping their nodes in memory.")
+
+    parser.add_argument("--mmapTraces",
+                        default=False,
+                        action="store_true",
+                        help="Keep only the offsets of the blocks of a trace in memory while it is analysed, and access "
+                             "the trace through mmap. Limits the memory used per trace when using --parallelTraces.")
+
+    parser.add_argument("--streamTraces",
+                        default=False,
+                        action="store_true",
+                        help="Index the IL while iltrans writes it to a pipe, instead of reading the trace file after "
+                             "iltrans has finished. Traces of inputs that are only executed are never written to disk.")
+
+    parser.add_argument("--parseProcesses",
+                        type=int,
+                        default=0,
+                        help="Number of worker processes indexing IL traces, and writing the code given to BAP from them, "
+                             "passed to them by file name. By default this is done by the thread using the traces, "
+                             "holding the GIL (default 0)")
+
+    parser.add_argument("--batchPathConditions",
+                        default=False,
+                        action="store_true",
+                        help="Translate each trace to a single formula once, and cut the path condition of every branch "
+                             "from it, instead of translating the prefix of the trace for every branch.")
 
     parser.add_argument("--parallelTraces",
                         type=int,
@@ -119,6 +145,31 @@ def parse_arguments(program, arguments):
                         default=0,
                         help="Maximum time to run tracer tools such as pin etc. 0 Means no timeout. Remember to ignore signal SIGXCPU")
 
+    parser.add_argument("--coverageFirst",
+                        default=False,
+                        action="store_true",
+                        help="Run every generated input once recording only coverage, and trace it in full only if it "
+                             "found new blocks or branches, crashed, or the strategy asks for it.")
+
+    parser.add_argument("--nativeExecuteOnly",
+                        default=False,
+                        action="store_true",
+                        help="Run inputs which are only checked for faults, e.g. those of --check-stack-writes, natively "
+                             "instead of under the tracer. They add no coverage.")
+
+    parser.add_argument("--calibrateTimeouts",
+                        default=False,
+                        action="store_true",
+                        help="Derive --tracerTimeout from the runs on the initial inputs, and --extTimeout from the first "
+                             "runs of iltrans and the solver, as 10 times the longest run. Given timeouts are only "
+                             "raised. Remember to ignore signal SIGXCPU")
+
+    parser.add_argument("--coverageFormat",
+                        default="text",
+                        choices=["text", "binary"],
+                        help="Format of the coverage files written by the tracer. 'binary' files are read without "
+                             "parsing text. (Default text)")
+
     parser.add_argument("--limitTrace",
                         type=int,
                         default=-1,
@@ -127,7 +178,9 @@ def parse_arguments(program, arguments):
     parser.add_argument("--maxTraceQueue",
                         type=int,
                         default=0,
-                        help="Maximum number of traces in trace queue before pausing tracer. 0 Means no limit.")
+                        help="Maximum number of traces in trace queue, or being traced, before pausing tracer. Inputs that "
+                             "are only executed, or only run for coverage with --coverageFirst, are not paused. "
+                             "0 Means no limit.")
 
 
     parser.add_argument("-c", "--clean",
@@ -191,6 +244,34 @@ def parse_arguments(program, arguments):
                         default=5,
                         help="Number of threads used to analyze individual branch modifications (default 5)")
 
+    parser.add_argument("--solverPool",
+                        action="store_true",
+                        default=False,
+                        help="Solve path conditions with a pool of --bapPool solver workers, passing queries over pipes "
+                             "instead of files")
+
+    parser.add_argument("--solverCommand",
+                        default=None,
+                        help="Command starting a long-lived solver worker for --solverPool, answering queries separated by "
+                             "'%% END' lines. By default every worker keeps an stp process running.")
+
+    parser.add_argument("--sliceConstraints",
+                        action="store_true",
+                        default=False,
+                        help="Only pass the constraints sharing variables with the altered branch to the solver. "
+                             "Other input bytes keep their previous values.")
+
+    parser.add_argument("--solverCache",
+                        type=int,
+                        default=0,
+                        help="Number of solver results to keep in memory, keyed by the normalized path condition. "
+                             "0 Means no cache.")
+
+    parser.add_argument("--persistSolverCache",
+                        action="store_true",
+                        default=False,
+                        help="Also store the results of --solverCache in the work directory, to be reused with --resume")
+
     parser.add_argument("--profile",
                         action="store_true",
                         default=False,
@@ -331,6 +412,21 @@ def performance_measurements(working_state):
     concolic.setPerformanceMeasurer(perf)
 
 
+def flow_control(working_state, options):
+    """
+    Limits the traces traced but not yet taken by BAP to `--maxTraceQueue`.
+    """
+    working_state.trace_credits.capacity = options.maxTraceQueue
+
+
+def concolic_engine(options):
+    """
+    Starts the resources the concolic engine shares between traces.
+    They are stopped by `concolic.stopEngine`.
+    """
+    concolic.startEngine(options)
+
+
 def assert_required_tools_defined(options):
     required_path_string = "The `{tool}' tool must be specified using `--{arg} <path>'"
     required_tools = {
@@ -27,8 +27,9 @@ import sys
 import traceback
 import logging
 import os
-from threading import current_thread
-from time import sleep
+from math import ceil
+from threading import Lock, current_thread
+from time import time
 
 try:
     import queue
@@ -36,6 +37,7 @@ except ImportError:
     import Queue as queue
 
 from opensaw.concolic import ConcolicEngine
+from opensaw.utils import native
 from opensaw.utils.jobs import TraceJob
 from opensaw.utils.threads import ThreadPool
 
@@ -57,6 +59,32 @@ SIGNALS = {
     24: "SIGXCPU"
 }
 
+# The timeouts derived by `--calibrateTimeouts` are this many times
+# the longest run of a tool on the initial inputs.
+CALIBRATION_FACTOR = 10
+
+
+def calibrated_timeout(timeout, walls):
+    """
+    Returns `CALIBRATION_FACTOR` times the longest of the `walls`, at
+    least one second, or the given `timeout` if that is longer. A `timeout`
+    of 0 was not given and is replaced, rather than taken as the shortest.
+    Without any `walls` there is nothing to derive, and `timeout` is kept.
+
+    >>> calibrated_timeout(5, [0.3, 1.25])
+    13
+    >>> calibrated_timeout(20, [1.25])
+    20
+    >>> calibrated_timeout(0, [0.01])
+    1
+    >>> calibrated_timeout(0, [0, 0])
+    0
+    """
+    wall = max(walls)
+    if wall <= 0:
+        return timeout
+    return max(timeout, int(ceil(CALIBRATION_FACTOR * wall)), 1)
+
 
 class Worker(object):
     """
@@ -69,6 +97,8 @@ class Worker(object):
         self.statistics = work.statistics
         self.strategy = strategy
         self.options = options
+        self.calibration_lock = Lock()
+        self.ext_calibrated = False
 
     def run(self):
         """
@@ -80,39 +110,32 @@ class Worker(object):
         - New inputs from BAP component are fetched by the get method
         """
         thread = current_thread()
+        stage = self.statistics.stage("pin")
 
         logging.debug("Running PIN in thread: {}".format(thread.name))
 
         while not thread.is_stopped():
-            bap_queue_full = self.options.maxTraceQueue != 0 and self.work.trace_queue.qsize() > self.options.maxTraceQueue
-            if bap_queue_full:
-                if self.options.discardOverflow:
-                    # Temporary use of private stuff - self.work.trace_queue is a DiscardablePriorityQueue, discard()
-                    # removes item that was last in this queue. In fact this should probably be done somewhere else,
-                    # in some other way.
-                    try:
-                        discarded_job = self.work.trace_queue.discard()
-                    except queue.Queue.empty:
-                        discarded_job = None
-
-                    if discarded_job is not None and os.path.exists(discarded_job.file_name):
-                        os.unlink(discarded_job.file_name)
-                else:
-                    sleep(1)
-                continue
-
-            job = thread.get()
+            # Waits for a job, and the trace credit it needs, see `needs_trace_credit`.
+            # Returns None when the thread is stopped.
+            start = time()
+            job, stalled = self.work.in_queue.get_scheduled(
+                self.needs_trace_credit, self.take_trace_credit, thread.is_stopped)
+            if stalled:
+                stage.report_stall(stalled)
 
             if job is None:
-                sleep(1)
                 continue
 
+            stage.report_job(self.work.in_queue.qsize(), time() - start - stalled)
+
             logging.debug("Got input task: {}.".format(job.file_name))
 
-            if job.is_initial():
-                self.strategy.handlePINInitInput(job)
-            else:
-                self.strategy.handlePINNewInput(job)
+            # A job put back to wait for its full trace has been handled.
+            if "pin:full_trace" not in job:
+                if job.is_initial():
+                    self.strategy.handlePINInitInput(job)
+                else:
+                    self.strategy.handlePINNewInput(job)
             self.handle_input_job(thread, job)
 
 
@@ -129,14 +152,92 @@ class Worker(object):
         in_file = job.file_name
 
         logging.debug("Handling input: {}".format(in_file))
+
+        # Inputs which are only checked for faults need no trace,
+        # the signal is read from the exit status of a native run.
+        if not create_trace_job_after_exec and self.options.nativeExecuteOnly:
+            try:
+                self.execute_native(in_file)
+            except Exception as e:
+                logging.error("Native execution of input %s caused exception %s. Skipping."%(in_file,repr(e)))
+            self.statistics.mark_thread_complete()
+            parent_thread.task_done()
+            return
+
+        credit = self.needs_trace_credit(job)
+
+        # Inputs without new coverage are not traced in full.
+        if create_trace_job_after_exec and not credit:
+            if not self.needs_full_trace(job):
+                self.statistics.mark_thread_complete()
+                parent_thread.task_done()
+                return
+
+            # The full trace waits in the queue for a credit, unless one is free.
+            job["pin:full_trace"] = True
+            if not self.take_trace_credit():
+                self.work.in_queue.put_back(job)
+                return
+            credit = True
+
+        queued = False
         try:
-            raw_trace = self.create_trace(in_file)
+            queued = self.trace_input_job(parent_thread, job, create_trace_job_after_exec)
+        finally:
+            # The credit of a queued trace is returned by BAP when it takes the trace.
+            if credit and not queued:
+                self.work.trace_credits.release()
+
+    def needs_trace_credit(self, job):
+        """
+        Returns `True` if `job` is traced for BAP right away, which needs
+        a trace credit, see `--maxTraceQueue`. Inputs which are only
+        executed need none, nor do inputs run for coverage first with
+        `--coverageFirst`, until they are found to need a full trace.
+        A tracer without a credit runs those inputs instead of waiting.
+        """
+        if "pin:execute_only" in job:
+            return False
+        return not self.options.coverageFirst or "pin:full_trace" in job
+
+    def take_trace_credit(self):
+        """
+        Takes a credit for a trace for BAP if one is free. When there is
+        none, the queued trace with the lowest priority is discarded with
+        `--discardOverflow`, and its credit taken over.
+        """
+        if self.work.trace_credits.try_acquire():
+            return True
+
+        if not self.options.discardOverflow:
+            return False
+
+        try:
+            discarded_job = self.work.trace_queue.discard()
+        except queue.Empty:
+            return False
+
+        ConcolicEngine(discarded_job.file_name, discarded_job.input_name).cleanup()
+        return True
+
+    def trace_input_job(self, parent_thread, job, create_trace_job_after_exec):
+        """
+        Traces the input of `job`, and submits the trace to BAP unless
+        it is only executed. Returns `True` if the trace was submitted.
+        """
+        in_file = job.file_name
+
+        try:
+            raw_trace = self.create_trace(in_file, create_trace_job_after_exec)
         except Exception as e:
             print("Exception in user code: %s"%repr(e))
             traceback.print_exc(file=sys.stdout)
             logging.error("Trace creation for input %s caused exception %s. Skipping."%(in_file,repr(e)) )
             parent_thread.task_done()
-            return
+            return False
+
+        if self.options.calibrateTimeouts:
+            self.calibrate_timeouts(job)
 
         #Mark a thread finished in statistics.
         self.statistics.mark_thread_complete()        
@@ -144,9 +245,9 @@ class Worker(object):
         if raw_trace.isSuccess() == False:
             logging.error("Got no trace from input: %s" % in_file)
             parent_thread.task_done()
-            return
+            return False
 
-        success = self.report_coverage(raw_trace)
+        success = self.report_coverage(raw_trace) is not None
 
         if success:
             raw_trace.removeCoverage()
@@ -159,7 +260,7 @@ class Worker(object):
             trace_job = TraceJob(raw_trace.getFilename(), in_file)
 
             # Update trace graph with the new BBL hashes.
-            trace, (new_blocks, new_edges) = self.work.tracegraph.update(
+            _, (new_blocks, new_edges) = self.work.tracegraph.update(
                 trace_job, raw_trace.getBblHashes(), raw_trace.getInsCounts(), not self.options.ctxIndependent)
             # Set additional properties.
             if self.options.ranking == 'N':
@@ -175,25 +276,24 @@ class Worker(object):
             trace_job.new_edges = new_edges
             trace_job.priority = rank
 
-            if not self.options.reanalyzeTraces:
-                trace_job["tracegraph:trace"] = trace
-
             shouldHandle = self.strategy.handlePINNewTrace(job, trace_job)
 
             # Submit the trace for input generation
-            if shouldHandle is not False:
-                parent_thread.put(trace_job)
+            queued = shouldHandle is not False and parent_thread.put(trace_job)
+        else:
+            queued = False
 
         parent_thread.task_done()
+        return queued
 
-    def create_trace(self, in_file_path):
+    def create_trace(self, in_file_path, keep_trace=True):
         thread_id = current_thread().ident
 
         pin_log_file = self.work.dir.local_path_for_file(
             "pintool-{}.log".format(thread_id))
 
         # execute to create new binary trace
-        raw_trace = ConcolicEngine.executeTracer(in_file_path,pin_log_file,self.work.dir.path,self.options,self.statistics)
+        raw_trace = ConcolicEngine.executeTracer(in_file_path,pin_log_file,self.work.dir.path,self.options,self.statistics,keep_trace)
         if not raw_trace.isSuccess():
             logging.error(raw_trace.getError())
         else:
@@ -204,23 +304,106 @@ class Worker(object):
         return raw_trace
 
 
+    def calibrate_timeouts(self, job):
+        """
+        Derives `--tracerTimeout` from the longest run of the tracer so far
+        when tracing initial inputs with `--calibrateTimeouts`. The solver
+        has not run yet at the initial traces, so `--extTimeout` is derived
+        once, from the longest runs of iltrans and the solver, at the first
+        trace after both have run. Given timeouts are only ever raised.
+        """
+        perf = self.statistics.perf
+        with self.calibration_lock:
+            tracer, ext = self.options.tracerTimeout, self.options.extTimeout
+            if job.is_initial() and perf.pin.max_wall > 0:
+                self.options.tracerTimeout = calibrated_timeout(tracer, [perf.pin.max_wall])
+            walls = [perf.il_tool.max_wall, perf.solver.max_wall]
+            if not self.ext_calibrated and all(wall > 0 for wall in walls):
+                self.options.extTimeout = calibrated_timeout(ext, walls)
+                self.ext_calibrated = True
+
+            if (tracer, ext) != (self.options.tracerTimeout, self.options.extTimeout):
+                logging.info("Calibrated timeouts: --tracerTimeout %d --extTimeout %d" %
+                             (self.options.tracerTimeout, self.options.extTimeout))
+
+    def needs_full_trace(self, job):
+        """
+        Returns `True` if the input of `job` should be traced in full with
+        `--coverageFirst`. Every input is counted in `coverage_inputs`,
+        and those traced in full in `full_traces`.
+        """
+        perf = self.statistics.perf.pin
+        try:
+            full_trace = self.run_coverage_tier(job)
+        except Exception as e:
+            logging.error("Coverage run of input %s caused exception %s. Tracing in full."%(job.file_name,repr(e)))
+            full_trace = True
+
+        perf.count("coverage_inputs")
+        if full_trace:
+            perf.count("full_traces")
+        return full_trace
+
+    def run_coverage_tier(self, job):
+        """
+        Runs the coverage tier of `--coverageFirst`, a cheap run only recording
+        coverage. Returns `True` if the input should also be traced in full, as
+        it found new blocks or branches, crashed, or the strategy asks for it.
+        """
+        perf = self.statistics.perf.pin
+        if job.is_initial() or self.strategy.wantsFullTrace(job):
+            return True
+
+        # Engines without a coverage tier always trace in full.
+        if not hasattr(ConcolicEngine, "executeCoverage"):
+            return True
+
+        pin_log_file = self.work.dir.local_path_for_file(
+            "pintool-{}.log".format(current_thread().ident))
+        run = ConcolicEngine.executeCoverage(job.file_name, pin_log_file, self.work.dir.path, self.options, self.statistics)
+        perf.count("coverage_runs")
+        try:
+            if not run.isSuccess():
+                logging.error(run.getError())
+                full_trace = True
+            else:
+                # Runs without coverage, and faults, are checked on the full trace.
+                full_trace = self.report_coverage(run) is not False or run.getSignal() is not None
+        finally:
+            if run.isSuccess():
+                run.removeCoverage()
+                run.cleanup()
+
+        return full_trace
+
+    def execute_native(self, in_file_path):
+        if self.options.checkFaults:
+            signal_number = native.execute(self.options, in_file_path, self.statistics.perf.native.timed_call)
+            # No blocks were traced, so the crash has no trace.
+            self.report_fault(signal_number, in_file_path, lambda: [])
+
     def check_faults(self, raw_trace):
+        if self.options.checkFaults:
+            #Anders: Possibly naive assumption that the last node visited caused the crash
+            self.report_fault(raw_trace.getSignal(), raw_trace.getInputFile(), lambda: self.build_crash_trace(raw_trace))
+
+    def report_fault(self, signal_number, in_file_path, crash_trace):
         fault_string = "signal {fault} caused by input: {file}"
 
-        if self.options.checkFaults:
-            signal_number = raw_trace.getSignal()
+        if signal_number is None:
+            return
 
-            if signal_number is None or SIGNALS[signal_number] in self.options.ignoreSignals:
-                return
+        # Native runs may be terminated by signals never seen in traces.
+        fault = SIGNALS.get(signal_number, str(signal_number))
+        if fault in self.options.ignoreSignals:
+            return
 
-            message = fault_string.format(
-                fault=SIGNALS[signal_number], file=raw_trace.getInputFile())
-            logging.error(message)
-            print(message)
-            if self.options.singleError:
-                self.work.force_done()
-            #Anders: Possibly naive assumption that the last node visited caused the crash
-            self.statistics.crashes.report(raw_trace.getInputFile(), signal_number, self.build_crash_trace(raw_trace))
+        message = fault_string.format(fault=fault, file=in_file_path)
+        logging.error(message)
+        print(message)
+        if self.options.singleError:
+            self.work.force_done()
+        self.statistics.crashes.report(in_file_path, signal_number, crash_trace())
 
     def build_crash_trace(self, raw_trace):
         ret = []
@@ -237,9 +420,20 @@ class Worker(object):
         return ret
 
     def report_coverage(self, raw_trace):
+        """
+        Merges the coverage of `raw_trace`. Returns `None` if the trace has
+        no coverage, otherwise `True` if it found new blocks or branches.
+        """
+        # Engines providing coverage as arrays are merged without building a dictionary.
+        if hasattr(raw_trace, "getCoverageArrays"):
+            coverage = raw_trace.getCoverageArrays()
+            if coverage is None:
+                return None
+            with self.statistics.coverage:
+                return self.statistics.coverage.update_arrays(*coverage)
+
         coverage = raw_trace.getCoverage()
         if coverage == None:
-            return False
+            return None
         with self.statistics.coverage:
-            self.statistics.coverage.update(coverage)
-            return True
+            return self.statistics.coverage.update(coverage)
@@ -18,3 +18,4 @@
 from .aggregate import Aggregate
 from .coverage import Coverage
 from .performance import Performance
+from .stages import Stage
@@ -15,10 +15,13 @@
     with this program; if not, write to the Free Software Foundation, Inc.,
     51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
+from __future__ import division
+
 from time import time
 from opensaw.statistics.performance import Performance
 from opensaw.statistics.coverage import Coverage
 from opensaw.statistics.crashes import Crashes
+from opensaw.statistics.stages import Stage
 
 
 class Aggregate(object):
@@ -32,6 +35,21 @@ class Aggregate(object):
         self.crashes = Crashes(self.start)
         self.coverage = Coverage(self.start)
         self.perf = DynamicPerformance()
+        self.stages = {}
+
+    def __setstate__(self, d):
+        self.__dict__.update(d)
+        # Statistics saved before the stages were measured.
+        self.__dict__.setdefault("stages", {})
+
+    def stage(self, name):
+        """
+        Returns the `Stage` measurements of the stage `name`.
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages.setdefault(name, Stage())
+        return stage
 
     def complete(self):
         self.end = time()
@@ -39,6 +57,18 @@ class Aggregate(object):
     def mark_thread_complete(self):
         self.last_thread = time()
 
+    def full_trace_ratio(self):
+        """
+        The share of the inputs traced in full with `--coverageFirst`,
+        including the initial inputs and those the strategy asked for,
+        or `None` if no inputs were traced with it.
+        """
+        counters = self.perf.pin.counters
+        inputs = counters.get("coverage_inputs", 0)
+        if not inputs:
+            return None
+        return counters.get("full_traces", 0) / inputs
+
     def to_json(self):
         complete = self.end is not None
         end = self.end if complete else time()
@@ -48,6 +78,8 @@ class Aggregate(object):
             "time_last_thread": end - self.last_thread,
             "done": complete,
             "performance": self.perf,
+            "full_trace_ratio": self.full_trace_ratio(),
+            "stages": self.stages,
             "crashes": self.crashes,
             "coverage": self.coverage
         }
@@ -29,16 +29,25 @@ both bits 1 and 2 should be set.
 """
 
 import logging
+from numbers import Integral
 from time import time
 
 from opensaw.statistics.semaphore import Semaphore
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 NON_CONDITIONAL = NEITHER_BRANCH = 0
 TRUE_BRANCH = 1
 FALSE_BRANCH = 2
 BOTH_BRANCHES = 3
 CONDITIONAL = 4
 
+# The keys of `ArrayBlocks` are unsigned 64-bit integers.
+MAX_KEY = (1 << 64) - 1
+
 
 def is_conditional(path):
     """
@@ -62,6 +71,95 @@ def taken_branches(path):
     return 1
 
 
+class DictBlocks(object):
+    """
+    The visited blocks as a dictionary, merged entry by entry.
+    """
+    def __init__(self):
+        self.paths = dict()
+
+    def merge(self, keys, paths):
+        for key, path in zip(keys, paths):
+            self.paths[key] = self.paths.get(key, 0) | path
+
+    def summary(self):
+        """
+        Returns the number of found blocks, found branches,
+        visited blocks and visited branches.
+        """
+        values = self.paths.values()
+        conditionals = list(filter(is_conditional, values))
+
+        return (len(self.paths), 2 * len(conditionals),
+                len([v for v in values if v]), sum(map(taken_branches, conditionals)))
+
+    def as_dict(self):
+        return self.paths
+
+
+class ArrayBlocks(object):
+    """
+    The visited blocks as a sorted `numpy` array of keys, and the array
+    of their paths. Merging looks up the keys of an update with a binary
+    search, so only the update is sorted, and the known blocks are
+    only copied when new blocks are inserted.
+    """
+    def __init__(self):
+        self.keys = numpy.empty(0, dtype=numpy.uint64)
+        self.paths = numpy.empty(0, dtype=numpy.uint8)
+
+    @staticmethod
+    def accepts(keys):
+        """
+        Returns whether every key of `keys` is an integer which fits
+        the key array, e.g. not the negative `hash` of a location.
+        """
+        if isinstance(keys, numpy.ndarray) and keys.dtype == numpy.uint64:
+            return True
+        return all(isinstance(key, Integral) and 0 <= key <= MAX_KEY for key in keys)
+
+    def merge(self, keys, paths):
+        keys = numpy.asarray(keys, dtype=numpy.uint64)
+        paths = numpy.asarray(paths, dtype=numpy.uint8)
+        if not len(keys):
+            return
+
+        # Combine the paths of equal keys within the update.
+        order = numpy.argsort(keys, kind="mergesort")
+        keys = keys[order]
+        paths = paths[order]
+        starts = numpy.flatnonzero(numpy.concatenate(([True], keys[1:] != keys[:-1])))
+        keys = keys[starts]
+        paths = numpy.bitwise_or.reduceat(paths, starts)
+
+        positions = numpy.searchsorted(self.keys, keys)
+        known = positions < len(self.keys)
+        known[known] = self.keys[positions[known]] == keys[known]
+
+        # The keys are unique, so every known block is updated once.
+        self.paths[positions[known]] |= paths[known]
+
+        new = ~known
+        if new.any():
+            self.keys = numpy.insert(self.keys, positions[new], keys[new])
+            self.paths = numpy.insert(self.paths, positions[new], paths[new])
+
+    def summary(self):
+        conditionals = self.paths[(self.paths & CONDITIONAL) != 0]
+
+        return (len(self.keys), 2 * len(conditionals),
+                int(numpy.count_nonzero(self.paths)),
+                int(numpy.count_nonzero(conditionals & TRUE_BRANCH) +
+                    numpy.count_nonzero(conditionals & FALSE_BRANCH)))
+
+    def as_dict(self):
+        return dict(zip(self.keys.tolist(), self.paths.tolist()))
+
+
+def new_blocks():
+    return DictBlocks() if numpy is None else ArrayBlocks()
+
+
 class Coverage(Semaphore):
     """
     The Coverage statistics class keeps track of the visited
@@ -72,9 +170,9 @@ class Coverage(Semaphore):
         Semaphore.__init__(self)
         self.start = start_time
 
-        # blocks is the datastructure which keeps track
+        # visits is the datastructure which keeps track
         # of the actual coverage
-        self.blocks = dict()
+        self.visits = new_blocks()
 
         # The below variables are statistics snapshots
         # which are delivered on request
@@ -87,23 +185,50 @@ class Coverage(Semaphore):
         self.visited_blocks = [0]
         self.visited_branches = [0]
 
+    def when_unpickled(self):
+        Semaphore.when_unpickled(self)
+
+        # Coverage saved as a dictionary of blocks is keyed by the `hash`
+        # of every location, which the keys of `il.location_key` never
+        # match, so the blocks are found again from the next traces.
+        if "blocks" in self.__dict__:
+            blocks = self.__dict__.pop("blocks")
+            logging.warning("Discarding %d blocks of coverage saved with old keys" % len(blocks))
+            self.visits = new_blocks()
+            self.found_blocks = 0
+            self.found_branches = 0
+
+    @property
+    def blocks(self):
+        """
+        The path of every found block, as a dictionary.
+        """
+        return self.visits.as_dict()
+
     def update(self, trace):
         """
         Updates the coverage dictionary with the new entries.
+        Returns `True` if new blocks or branches were found or visited.
         """
-        for addr, path in trace.items():
-            self.blocks.setdefault(addr, 0)
-            self.blocks[addr] |= path
+        return self.update_arrays(list(trace.keys()), list(trace.values()))
 
-        values = self.blocks.values()
-
-        conditionals = list(filter(is_conditional, values))
+    def update_arrays(self, keys, paths):
+        """
+        Updates the coverage with the `paths` of the blocks `keys`.
+        Returns `True` if new blocks or branches were found or visited.
+        Keys which do not fit an `ArrayBlocks`, e.g. given by engines
+        without `getCoverageArrays`, are kept in a `DictBlocks`.
+        """
+        if isinstance(self.visits, ArrayBlocks) and not ArrayBlocks.accepts(keys):
+            logging.debug("Coverage keys outside 0..%d, keeping blocks in a dictionary" % MAX_KEY)
+            visits = self.visits.as_dict()
+            self.visits = DictBlocks()
+            self.visits.paths = visits
 
-        newly_found_blocks = len(self.blocks)
-        newly_found_branches = 2 * len(conditionals)
+        self.visits.merge(keys, paths)
 
-        newly_visited_blocks = len([v for v in values if v])
-        newly_visited_branches = sum(map(taken_branches, conditionals))
+        (newly_found_blocks, newly_found_branches,
+         newly_visited_blocks, newly_visited_branches) = self.visits.summary()
 
         changed = False
 
@@ -122,9 +247,11 @@ class Coverage(Semaphore):
             changed = True
 
         if changed:
-            logging.debug("Total branches seen: %d" % len(self.blocks.keys()))
+            logging.debug("Total branches seen: %d" % newly_found_blocks)
             self.updated = time()
 
+        return changed
+
     def to_json(self):
         return {
             "updated": self.updated,
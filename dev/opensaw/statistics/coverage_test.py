@@ -15,6 +15,9 @@
     with this program; if not, write to the Free Software Foundation, Inc.,
     51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
+import pickle
+
+from opensaw.statistics import coverage
 from opensaw.statistics.coverage import (Coverage,
                                          CONDITIONAL, NON_CONDITIONAL,
                                          TRUE_BRANCH, FALSE_BRANCH, BOTH_BRANCHES)
@@ -51,3 +54,56 @@ def test_coverage():
         2: NON_CONDITIONAL | BOTH_BRANCHES,
         3: CONDITIONAL     | FALSE_BRANCH
     }
+
+
+def test_update_arrays():
+    cov = Coverage(0)
+    cov.update_arrays([7, 1, 7], [CONDITIONAL | TRUE_BRANCH, NON_CONDITIONAL, CONDITIONAL | FALSE_BRANCH])
+    assert cov.blocks == {1: NON_CONDITIONAL, 7: CONDITIONAL | BOTH_BRANCHES}
+    assert cov.visited_branches[-1] == 2
+
+    cov.update_arrays([], [])
+    assert (cov.found_blocks, cov.found_branches) == (2, 2)
+
+
+def test_update_novelty():
+    cov = Coverage(0)
+    assert cov.update_arrays([7], [CONDITIONAL | TRUE_BRANCH])
+    assert not cov.update_arrays([7], [CONDITIONAL | TRUE_BRANCH])
+    # The other branch of a known block is new.
+    assert cov.update({7: CONDITIONAL | FALSE_BRANCH})
+    assert cov.update({1: NON_CONDITIONAL})
+    assert not cov.update({})
+
+
+def test_array_blocks_merge():
+    blocks = coverage.new_blocks()
+    blocks.merge([9, 3], [CONDITIONAL | TRUE_BRANCH, NON_CONDITIONAL])
+    blocks.merge([5, 9, 1 << 63, 5], [NON_CONDITIONAL, CONDITIONAL | FALSE_BRANCH, TRUE_BRANCH, BOTH_BRANCHES])
+
+    assert blocks.as_dict() == {3: NON_CONDITIONAL, 5: BOTH_BRANCHES, 9: CONDITIONAL | BOTH_BRANCHES,
+                                1 << 63: TRUE_BRANCH}
+    if coverage.numpy is not None:
+        assert list(blocks.keys) == sorted(blocks.keys)
+
+
+def test_keys_outside_array_range():
+    cov = Coverage(0)
+    cov.update_arrays([7], [CONDITIONAL | TRUE_BRANCH])
+    # E.g. the `hash` of a location, given by another engine.
+    assert cov.update({-5: CONDITIONAL | FALSE_BRANCH, 7: CONDITIONAL | FALSE_BRANCH})
+    assert cov.blocks == {-5: CONDITIONAL | FALSE_BRANCH, 7: CONDITIONAL | BOTH_BRANCHES}
+
+
+def test_unpickle_old_keys():
+    cov = Coverage(0)
+    cov.update({1: NON_CONDITIONAL | BOTH_BRANCHES})
+    del cov.__dict__["visits"]
+    cov.__dict__["blocks"] = {-5: CONDITIONAL | TRUE_BRANCH}
+
+    cov = pickle.loads(pickle.dumps(cov))
+
+    # Old keys never match the keys of new traces.
+    assert cov.blocks == {}
+    assert cov.update({1: NON_CONDITIONAL})
+    assert cov.found_blocks == 1
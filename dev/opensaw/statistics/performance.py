@@ -39,22 +39,59 @@ the `Performance` instance.
 """
 
 from subprocess import PIPE, Popen, CalledProcessError
-from operator import itemgetter
+from time import time
 
-from opensaw.utils.funs import compose
 from opensaw.statistics.semaphore import Semaphore
-import re
+from opensaw.utils.ringbuffer import RingBuffer
+from opensaw.utils.processgroups import GroupDeadline, drain, new_group
+import errno
 import os
 import logging
-import resource
-import tempfile
-# Given a string; we split at the spaces,
-# get the second item, and parse it as a float.
-#
-# For example:
-#
-#       "user 0.40" -> ["user", "0.40"] -> "0.40" -> 0.4
-get_time_from_line = compose(float, itemgetter(1), str.split)
+import signal
+# A command limited to `timeout` seconds of CPU time is terminated
+# after `WALL_FACTOR * timeout` seconds of wall-clock time, when it
+# is blocked, e.g. on I/O, rather than running.
+WALL_FACTOR = 2
+
+
+def wall_timeout(timeout):
+    return WALL_FACTOR * timeout
+
+
+# The resource usage summed over all calls, with the
+# `resource.struct_rusage` field each one is read from.
+USAGE_FIELDS = [
+    ("user", "ru_utime"),
+    ("sys", "ru_stime"),
+    ("minor_faults", "ru_minflt"),
+    ("major_faults", "ru_majflt"),
+    ("blocks_in", "ru_inblock"),
+    ("blocks_out", "ru_oublock")
+]
+
+
+class UsagePopen(Popen):
+    """
+    A `Popen` which reaps the child with `os.wait4`, and keeps
+    the resource usage of the child in `rusage`, and whether it
+    was stopped by its timeout in `timed_out`, see `timed_call`.
+    """
+    rusage = None
+    timed_out = False
+
+    def wait(self):
+        while self.returncode is None:
+            try:
+                _, status, self.rusage = os.wait4(self.pid, 0)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno != errno.ECHILD:
+                    raise
+                # Already reaped elsewhere, like `Popen.wait` assume success.
+                status = 0
+            self._handle_exitstatus(status)
+        return self.returncode
 
 
 class Performance(Semaphore):
@@ -62,6 +99,22 @@ class Performance(Semaphore):
         Semaphore.__init__(self)
         self.total = 0
         self.measurements = 0
+        self.counters = {}
+        self.wall = 0
+        self.max_wall = 0
+        self.max_rss = 0
+        self.usage = dict((name, 0) for name, _ in USAGE_FIELDS)
+
+    def when_unpickled(self):
+        Semaphore.when_unpickled(self)
+        # Measurements saved before counters and resource usage were added.
+        self.__dict__.setdefault("counters", {})
+        self.__dict__.setdefault("wall", 0)
+        self.__dict__.setdefault("max_wall", 0)
+        self.__dict__.setdefault("max_rss", 0)
+        self.__dict__.setdefault("usage", {})
+        for name, _ in USAGE_FIELDS:
+            self.usage.setdefault(name, 0)
 
     def report(self, time):
         """
@@ -70,6 +123,39 @@ class Performance(Semaphore):
         self.total += time
         self.measurements += 1
 
+    def report_usage(self, rusage, wall):
+        """
+        Reports the `resource.struct_rusage` of the last command,
+        and the wall-clock time it ran. The time reported to `report`
+        is the sum of its user- and system-time.
+        """
+        with self:
+            self.report(rusage.ru_utime + rusage.ru_stime)
+            for name, field in USAGE_FIELDS:
+                self.usage[name] += getattr(rusage, field)
+            self.wall += wall
+            self.max_wall = max(self.max_wall, wall)
+            # Kilobytes on Linux.
+            self.max_rss = max(self.max_rss, rusage.ru_maxrss)
+
+    def report_wall(self, wall, time=None):
+        """
+        Reports the wall-clock time of work, such as a query answered
+        by a long-lived process, and its CPU time to `report` if known.
+        """
+        with self:
+            if time is not None:
+                self.report(time)
+            self.wall += wall
+            self.max_wall = max(self.max_wall, wall)
+
+    def count(self, name, n=1):
+        """
+        Adds `n` to the counter `name`, e.g. the hits of a cache.
+        """
+        with self:
+            self.counters[name] = self.counters.get(name, 0) + n
+
     def to_json(self):
         average = 0
 
@@ -79,7 +165,12 @@ class Performance(Semaphore):
         return {
             "average": average,
             "total": self.total,
-            "measurements": self.measurements
+            "measurements": self.measurements,
+            "counters": self.counters,
+            "wall": self.wall,
+            "max_wall": self.max_wall,
+            "max_rss": self.max_rss,
+            "usage": self.usage
         }
 
     # Do not ignore any `kwargs`, should not be confused with 'subprocess'
@@ -95,35 +186,62 @@ class Performance(Semaphore):
 
         return out, err
 
-    def timed_call(self, cmd, stdin_file=None, timeout=0, save_stdout=True, save_stderr=False):
+    # Do not ignore any `kwargs`, should not be confused with 'subprocess'
+    def check_stream(self, cmd, consume, timeout=0):
         """
-        Executes the `cmd` command, and reports the time
-        spent on the command as the sum of user- and system-time.
+        Executes `cmd` like `check_output`, but passes the standard
+        output of the command to `consume` as a file object while the
+        command is running, instead of keeping it in memory.
+        Returns the result of `consume`.
         """
-        if timeout == 0:
-            limmin =resource.RLIM_INFINITY
-            limmax =resource.RLIM_INFINITY
-        else:
-            limmin = timeout
-            # Tracer needs some additional time to actually output the logfile...
-            # Timeout for tracer should probably be implemented somewhere else.
-            limmax = timeout+1
+        result = []
+        proc, out, err = self.timed_call(cmd, timeout=timeout, save_stderr=False,
+                                         consume=lambda stdout: result.append(consume(stdout)))
+
+        if proc.returncode:
+            raise CalledProcessError(proc.returncode, cmd, "%s \n %s"%(out,err))
 
+        return result[0]
+
+    def timed_call(self, cmd, stdin_file=None, timeout=0, save_stdout=True, save_stderr=False, consume=None, tail=0):
+        """
+        Executes the `cmd` command, and reports the time
+        spent on the command as the sum of user- and system-time,
+        along with the rest of its resource usage, see `report_usage`.
+        If `consume` is given, it is called with the standard
+        output of the command while the command is running.
+        With `tail`, only the last `tail` bytes of the saved outputs
+        are kept, so that the memory used is bounded.
+
+        The command runs in its own process group. With a `timeout`,
+        the command gets `timeout` seconds of CPU time, and the group
+        is terminated after `wall_timeout(timeout)` seconds. Commands
+        stopped by either limit are counted as `timeouts`, and have
+        `timed_out` set, so that their signal is not taken for a crash.
+        """
         # Closed automatically by Popen with close_fds=True
-        stdout_arg = PIPE if save_stdout else open(os.devnull, 'w')
+        stdout_arg = PIPE if save_stdout or consume is not None else open(os.devnull, 'w')
         stderr_arg = PIPE if save_stderr else open(os.devnull, 'w')
         stdin_arg = None if stdin_file is None else open(stdin_file,'rb')
 
-        f = tempfile.NamedTemporaryFile(delete=False)
-        f.close()
-        time_output = f.name
-
         proc = None
+        deadline = None
+        start = time()
         try:
-            proc = Popen(["/usr/bin/time","-o",time_output, "--portability"] + cmd,
-                         stdout=stdout_arg, stderr=stderr_arg, stdin=stdin_arg, close_fds=True, preexec_fn=(lambda: resource.setrlimit(resource.RLIMIT_CPU, (limmin,limmax))))
-            out, err = proc.communicate()
-            if not save_stdout:
+            # Tracer needs some additional time to actually output the logfile,
+            # so the hard CPU limit is a second later.
+            proc = UsagePopen(cmd, stdout=stdout_arg, stderr=stderr_arg, stdin=stdin_arg, close_fds=True,
+                              preexec_fn=new_group(timeout))
+            deadline = GroupDeadline(proc.pid, wall_timeout(timeout))
+            if consume is not None:
+                consume(proc.stdout)
+            if tail:
+                out, err = self.communicate_tail(proc, tail)
+            else:
+                out, err = proc.communicate()
+            if consume is not None:
+                out = "[Message by OpenSAW: STDOUT consumed while running]"
+            elif not save_stdout:
                 out = "[Message by OpenSAW: Saving STDOUT disabled]"
             if not save_stderr:
                 err = "[Message by OpenSAW: Saving STDERR disabled]"
@@ -133,39 +251,44 @@ class Performance(Semaphore):
             if proc is not None: # We know about the Proc, kill it
                 proc.kill()
                 proc.wait()
-            else: # We don't know, assume it started and wait for timeout hoping it will exit
-                import time
-                time.sleep(timeout*2)
-
-            if os.path.exists(time_output):
-                os.unlink(time_output)
             logging.error("timed_call resulted in exception %s"%repr(e))
             raise
+        finally:
+            if deadline is not None:
+                deadline.cancel()
 
-        # Parse the output of the time program
-        # user- and system-times spent executing the `cmd` command.
-        #
-        # For example:
-        #
-        #     ...
-        #     user 0.12
-        #     sys 0.03
-        if os.path.exists(time_output):
-            time = 0
-            with open(time_output,'r') as f:
-                for l in f:
-                    m = re.match("^(user|sys) ([0-9\\.]+).*$",l)
-                    if m is None:
-                        continue
-
-                    try:
-                       time = time + float(m.group(2))
-                    except ValueError as e:
-                        logging.error("Could not convert '%s' to time, ignoring - giving an invalid time result"%l)
-
-            with self:
-                self.report(time)
-
-            os.unlink(time_output)
+        # `wait4` already collected the resource usage of the command,
+        # no separate process is needed to measure it.
+        if proc.rusage is not None:
+            self.report_usage(proc.rusage, time() - start)
+        cpu_time = proc.rusage.ru_utime + proc.rusage.ru_stime if proc.rusage is not None else 0
+        proc.timed_out = self.count_timeout(proc.returncode, timeout, deadline.expired, cpu_time)
 
         return proc, out, err
+
+    @staticmethod
+    def communicate_tail(proc, tail):
+        """
+        Same as `proc.communicate()`, but only the last `tail`
+        bytes of each output are kept in a `RingBuffer`.
+        """
+        rings = [RingBuffer(tail), RingBuffer(tail)]
+        drain([(f, ring) for f, ring in zip([proc.stdout, proc.stderr], rings)
+               if f is not None and not f.closed])
+        proc.wait()
+        return rings[0].getvalue(), rings[1].getvalue()
+
+    def count_timeout(self, returncode, timeout, expired, cpu_time=0):
+        """
+        Counts, and returns whether, a command was stopped by its
+        `timeout`, either by the `expired` wall-clock deadline or
+        by the CPU limits. A SIGKILL is only taken for the hard CPU
+        limit if the command used `cpu_time` up to the `timeout`,
+        not e.g. when it was killed at shutdown or for memory.
+        """
+        # The soft CPU limit sends SIGXCPU, the hard limit SIGKILL.
+        cpu_limited = returncode == -signal.SIGXCPU or (returncode == -signal.SIGKILL and cpu_time >= timeout)
+        timed_out = bool(expired or (timeout and cpu_limited))
+        if timed_out:
+            self.count("timeouts")
+        return timed_out
@@ -15,7 +15,13 @@
     with this program; if not, write to the Free Software Foundation, Inc.,
     51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
-from opensaw.statistics.performance import Performance, get_time_from_line
+import pickle
+import signal
+import sys
+from time import time
+
+from opensaw.statistics import performance
+from opensaw.statistics.performance import Performance
 
 
 def test_performance():
@@ -30,8 +36,88 @@ def test_performance():
     assert (perf.total, perf.measurements) == (17, 3)
 
 
-def test_get_time_from_line():
-    assert get_time_from_line("user 3.12") == 3.12
+def test_performance_counters():
+    perf = Performance()
+    perf.count("hits")
+    perf.count("hits", 2)
+    perf.count("misses")
+    assert perf.to_json()["counters"] == {"hits": 3, "misses": 1}
+
+
+def test_timed_call_usage():
+    perf = Performance()
+    proc, out, err = perf.timed_call(["sh", "-c", "echo out; exit 3"])
+
+    assert proc.returncode == 3
+    assert out == "out\n"
+    assert perf.measurements == 1
+    assert perf.wall > 0
+    assert perf.max_wall == perf.wall
+    assert perf.max_rss > 0
+
+    perf.timed_call(["true"])
+    usage = perf.to_json()
+    assert usage["measurements"] == 2
+    assert abs(usage["total"] - usage["usage"]["user"] - usage["usage"]["sys"]) < 1e-9
+
+
+def test_timed_call_tail():
+    perf = Performance()
+    script = "import sys; sys.stdout.write('o' * 100000 + 'end'); sys.stderr.write('e' * 100000 + 'END')"
+    proc, out, err = perf.timed_call([sys.executable, "-c", script], save_stderr=True, tail=10)
+
+    assert proc.returncode == 0
+    assert out == "o" * 7 + "end"
+    assert err == "e" * 7 + "END"
+
+
+def test_timed_call_wall_timeout(monkeypatch):
+    monkeypatch.setattr(performance, "WALL_FACTOR", 0.5)
+    perf = Performance()
+    start = time()
+    # Blocked without using CPU time, and the pipe is kept open by the
+    # background sleep, so the whole group must be terminated.
+    proc, _, _ = perf.timed_call(["sh", "-c", "sleep 30 & sleep 30"], timeout=1)
+
+    assert time() - start < 5
+    assert proc.returncode < 0
+    assert proc.timed_out
+    assert perf.counters["timeouts"] == 1
+
+    proc, _, _ = perf.timed_call(["true"], timeout=1)
+    assert not proc.timed_out
+    assert perf.counters["timeouts"] == 1
+
+
+def test_count_timeout():
+    perf = Performance()
+
+    assert perf.count_timeout(-signal.SIGXCPU, 1, False)
+    assert perf.count_timeout(-signal.SIGKILL, 1, False, cpu_time=1.0)
+    assert perf.count_timeout(-signal.SIGTERM, 1, True)
+    assert perf.count_timeout(-signal.SIGKILL, 0, True)
+    # Killed before using its CPU time, e.g. at shutdown.
+    assert not perf.count_timeout(-signal.SIGKILL, 1, False, cpu_time=0.2)
+    assert not perf.count_timeout(-signal.SIGXCPU, 0, False)
+    assert not perf.count_timeout(0, 1, False)
+    assert perf.counters["timeouts"] == 4
+
+
+def test_check_stream():
+    perf = Performance()
+    lines = perf.check_stream(["printf", "a\\nb\\n"], list)
+
+    assert lines == ["a\n", "b\n"]
+    assert perf.measurements == 1
+
+
+def test_unpickle_old_performance():
+    perf = Performance()
+    perf.report(3)
+    for name in ["counters", "wall", "max_wall", "max_rss", "usage"]:
+        del perf.__dict__[name]
+
+    perf = pickle.loads(pickle.dumps(perf))
 
-    assert sum(map(get_time_from_line,
-                   "user 0.04\nsys 42.0".splitlines())) == 42.04
+    assert perf.to_json()["usage"]["user"] == 0
+    assert perf.to_json()["total"] == 3
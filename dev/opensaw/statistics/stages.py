@@ -0,0 +1,73 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+Stages
+======
+
+The `Stage` module measures the flow of jobs through a stage of the
+pipeline, the tracer stage `pin` and the input generation stage `bap`.
+"""
+from opensaw.statistics.semaphore import Semaphore
+
+
+class Stage(Semaphore):
+    """
+    The depth of the queue of a stage when its threads take a job, the
+    time its threads are idle waiting for a job, and the time they are
+    stalled waiting for credits for the next stage.
+    """
+
+    def __init__(self):
+        Semaphore.__init__(self)
+        self.jobs = 0
+        self.total_depth = 0
+        self.max_depth = 0
+        self.idle_time = 0
+        self.stalls = 0
+        self.stall_time = 0
+
+    def report_job(self, depth, idle_time):
+        """
+        Reports a job taken from a queue of `depth` jobs, after
+        waiting `idle_time` seconds for it.
+        """
+        with self:
+            self.jobs += 1
+            self.total_depth += depth
+            self.max_depth = max(self.max_depth, depth)
+            self.idle_time += idle_time
+
+    def report_stall(self, time):
+        with self:
+            self.stalls += 1
+            self.stall_time += time
+
+    def to_json(self):
+        average = 0
+
+        if self.jobs:
+            average = self.total_depth / float(self.jobs)
+
+        return {
+            "jobs": self.jobs,
+            "average_depth": average,
+            "max_depth": self.max_depth,
+            "idle_time": self.idle_time,
+            "stalls": self.stalls,
+            "stall_time": self.stall_time
+        }
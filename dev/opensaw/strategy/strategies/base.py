@@ -77,6 +77,20 @@ class Base(object):
         for k in input_job:
             trace_job[k] = input_job[k]
 
+    def wantsFullTrace(self, input_job):
+        """
+        Decide if the input job C{input_job} should be traced in full
+        even though its coverage run found no new blocks or branches.
+        Only called when tracing is tiered with --coverageFirst.
+        The default behaviour is to only trace inputs with new coverage.
+
+        @param input_job: input job
+        @type input_job: utils.jobs.InputJob
+
+        @returns True if the input should be traced in full
+        """
+        return False
+
     # BAP wrapper callbacks
     def handleBAPNewTrace(self, trace_job):
         """
@@ -41,6 +41,9 @@ class Parallel(Base):
     def handlePINNewTrace(self, input_job, trace_job):
         self.__stratList[self.__curr].handlePINNewTrace(input_job, trace_job)
 
+    def wantsFullTrace(self, input_job):
+        return self.__stratList[self.__curr].wantsFullTrace(input_job)
+
     # BAP wrapper callbacks
     def handleBAPNewTrace(self, trace_job):
         if self.first:
@@ -38,6 +38,9 @@ class Serial(Base):
         for s in self.__stratList:
             s.handlePINNewTrace(input_job, trace_job)
 
+    def wantsFullTrace(self, input_job):
+        return any(s.wantsFullTrace(input_job) for s in self.__stratList)
+
     # BAP wrapper callbacks
     def handleBAPNewTrace(self, trace_job):
         for s in self.__stratList:
@@ -0,0 +1,77 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+# Runs the program under test natively, without any tracer.
+#
+# Inputs tagged `pin:execute_only` are only checked for faults,
+# which can be read from the exit status of a native run
+# instead of from the end of a trace.
+
+from __future__ import absolute_import, print_function
+
+
+def program_arguments(options, input_file):
+    """
+    Returns the arguments of the program under test for `input_file`,
+    with the `{}` argument replaced by the file when `--inputType` is
+    `file`, and the file to pass on stdin, or `None`.
+
+        >>> class Options(object):
+        ...     args = ["-v", "{}"]
+        ...     inputType = "file"
+        >>> program_arguments(Options, "a.in")
+        (['-v', 'a.in'], None)
+        >>> Options.inputType = "stdin"
+        >>> program_arguments(Options, "a.in")
+        (['-v', '{}'], 'a.in')
+    """
+    program_args = options.args[:]  # Copy
+    stdin_file = None
+
+    if options.inputType == "file":
+        for idx, arg in enumerate(program_args):
+            if arg == '{}':
+                program_args[idx] = input_file
+                break
+    elif options.inputType == "stdin":
+        stdin_file = input_file
+    elif options.inputType != "none":
+        raise NotImplementedError("Argument to --input must either be 'file' or 'stdin'")
+
+    return program_args, stdin_file
+
+
+def execute(options, input_file, timed_call):
+    """
+    Runs the program under test on `input_file` with `timed_call`,
+    limited by `--tracerTimeout` like a tracer. Returns the number
+    of the signal that terminated the program, otherwise `None`.
+    A program stopped by the timeout did not crash, so `None` is
+    returned for it as well.
+    """
+    program_args, stdin_file = program_arguments(options, input_file)
+    proc, _, _ = timed_call([options.program] + program_args, stdin_file,
+                            timeout=options.tracerTimeout, save_stdout=False, save_stderr=False)
+
+    if proc.timed_out:
+        return None
+
+    # `Popen` reports a termination by signal `n` as a return code of `-n`.
+    if proc.returncode < 0:
+        return -proc.returncode
+    return None
@@ -0,0 +1,60 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from opensaw.statistics import performance
+from opensaw.statistics.performance import Performance
+from opensaw.utils.native import execute
+
+
+class Options(object):
+    program = "/bin/sh"
+    inputType = "file"
+    tracerTimeout = 0
+
+    def __init__(self, *args):
+        self.args = list(args)
+
+
+def test_execute_signal(tmpdir):
+    input_file = tmpdir.join("crash.in")
+    input_file.write("kill -SEGV $$")
+    perf = Performance()
+
+    assert execute(Options("{}"), str(input_file), perf.timed_call) == 11
+    assert perf.measurements == 1
+
+
+def test_execute_exit(tmpdir):
+    input_file = tmpdir.join("exit.in")
+    input_file.write("exit 3")
+    options = Options("-s")
+    options.inputType = "stdin"
+
+    assert execute(options, str(input_file), Performance().timed_call) is None
+
+
+def test_execute_timeout(tmpdir, monkeypatch):
+    monkeypatch.setattr(performance, "WALL_FACTOR", 0.5)
+    input_file = tmpdir.join("hang.in")
+    input_file.write("sleep 30")
+    options = Options("{}")
+    options.tracerTimeout = 1
+    perf = Performance()
+
+    # Terminated by the deadline, which is not a crash.
+    assert execute(options, str(input_file), perf.timed_call) is None
+    assert perf.counters["timeouts"] == 1
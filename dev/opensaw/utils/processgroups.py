@@ -0,0 +1,144 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+# Process groups of external tools.
+#
+# Every external tool is started in its own process group, so that
+# processes it leaves behind are stopped with it:
+#
+# - `new_group` starts the process in a new group with a CPU limit,
+# - `GroupDeadline` terminates the whole group when the wall-clock
+#   deadline of the process passes,
+# - `drain` reads the output pipes of the process into bounded
+#   outputs, e.g. a `RingBuffer` keeping only their last bytes.
+
+from __future__ import absolute_import, print_function
+
+import errno
+import os
+import resource
+import select
+import signal
+import threading
+
+# Bytes read from a pipe at once.
+CHUNK = 1 << 16
+
+# Seconds between terminating a process group at its deadline
+# with SIGTERM, and killing it with SIGKILL.
+KILL_AFTER = 2
+
+
+def kill_group(pid, sig=signal.SIGKILL):
+    try:
+        os.killpg(pid, sig)
+    except OSError:
+        # The whole group has already exited.
+        pass
+
+
+def new_group(cpu_limit=0):
+    """
+    Returns a `preexec_fn` starting the child in a new process group,
+    limited to `cpu_limit` seconds of CPU time, 0 meaning no limit.
+    """
+    if cpu_limit:
+        limits = (cpu_limit, cpu_limit + 1)
+    else:
+        limits = (resource.RLIM_INFINITY, resource.RLIM_INFINITY)
+
+    def prepare():
+        os.setsid()
+        resource.setrlimit(resource.RLIMIT_CPU, limits)
+    return prepare
+
+
+def drain(pipes):
+    """
+    Reads every file of the `(file, output)` pairs `pipes` until it is
+    closed, writing what is read to its output, e.g. a `RingBuffer`.
+    Unlike `Popen.communicate`, the outputs decide what is kept.
+    """
+    files = {}
+    poller = select.poll()
+    for f, output in pipes:
+        files[f.fileno()] = (f, output)
+        poller.register(f.fileno(), select.POLLIN)
+
+    while files:
+        try:
+            events = poller.poll()
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            continue
+
+        for fd, _ in events:
+            f, output = files[fd]
+            try:
+                data = os.read(fd, CHUNK)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if data:
+                output.write(data)
+            else:
+                poller.unregister(fd)
+                f.close()
+                del files[fd]
+
+
+class GroupDeadline(object):
+    """
+    Terminates the process group of `pid` with SIGTERM if not cancelled
+    within `timeout` seconds, and kills it with SIGKILL `KILL_AFTER`
+    seconds later. A `timeout` of 0 means no deadline.
+    """
+
+    def __init__(self, pid, timeout):
+        self.pid = pid
+        self.expired = False
+        self.lock = threading.Lock()
+        self.timer = None
+        if timeout:
+            self.schedule(timeout, self.terminate)
+
+    def schedule(self, delay, fn):
+        self.timer = threading.Timer(delay, fn)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def terminate(self):
+        with self.lock:
+            if self.timer is None:
+                return
+            self.expired = True
+            kill_group(self.pid, signal.SIGTERM)
+            self.schedule(KILL_AFTER, self.kill)
+
+    def kill(self):
+        with self.lock:
+            if self.timer is not None:
+                kill_group(self.pid)
+
+    def cancel(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
@@ -0,0 +1,38 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+import signal
+from subprocess import Popen
+
+from opensaw.utils import processgroups
+from opensaw.utils.processgroups import GroupDeadline
+
+
+def test_group_deadline(monkeypatch):
+    monkeypatch.setattr(processgroups, "KILL_AFTER", 0.2)
+
+    proc = Popen(["sh", "-c", "sleep 30"], preexec_fn=processgroups.new_group())
+    deadline = GroupDeadline(proc.pid, 0.2)
+    assert proc.wait() == -signal.SIGTERM
+    deadline.cancel()
+    assert deadline.expired
+
+    proc = Popen(["true"], preexec_fn=processgroups.new_group())
+    deadline = GroupDeadline(proc.pid, 10)
+    proc.wait()
+    deadline.cancel()
+    assert not deadline.expired
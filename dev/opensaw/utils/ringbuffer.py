@@ -0,0 +1,72 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+# Fixed-size buffer keeping the last bytes written to it.
+
+from __future__ import absolute_import, print_function
+
+
+class RingBuffer(object):
+    """
+    Keeps the last `size` bytes written, in a preallocated buffer,
+    so the memory used is constant however much is written.
+
+        >>> ring = RingBuffer(4)
+        >>> ring.write("abc")
+        >>> ring.write("def")
+        >>> ring.getvalue()
+        'cdef'
+        >>> ring.dropped
+        2
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.buffer = bytearray(size)
+        # The position of the next byte written, and
+        # the total number of bytes written.
+        self.position = 0
+        self.written = 0
+
+    @property
+    def dropped(self):
+        """
+        The number of bytes written but no longer kept.
+        """
+        return max(0, self.written - self.size)
+
+    def write(self, data):
+        self.written += len(data)
+        if not self.size:
+            return
+
+        # Only the last `size` bytes of `data` can be kept.
+        data = data[-self.size:]
+        end = self.position + len(data)
+        if end <= self.size:
+            self.buffer[self.position:end] = data
+        else:
+            split = self.size - self.position
+            self.buffer[self.position:] = data[:split]
+            self.buffer[:end - self.size] = data[split:]
+        self.position = end % self.size
+
+    def getvalue(self):
+        if self.written < self.size:
+            return str(self.buffer[:self.written])
+        return str(self.buffer[self.position:] + self.buffer[:self.position])
@@ -0,0 +1,42 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+from opensaw.utils.ringbuffer import RingBuffer
+
+
+def test_ring_buffer():
+    ring = RingBuffer(8)
+    assert ring.getvalue() == ""
+
+    ring.write("abc")
+    assert ring.getvalue() == "abc"
+
+    written = "abc"
+    for chunk in ["defgh", "ij", "klmnopqrstuvwxyz", "", "1"]:
+        ring.write(chunk)
+        written += chunk
+        assert ring.getvalue() == written[-8:]
+        assert ring.written == len(written)
+
+    assert ring.dropped == len(written) - 8
+
+
+def test_empty_ring_buffer():
+    ring = RingBuffer(0)
+    ring.write("abc")
+    assert ring.getvalue() == ""
+    assert ring.dropped == 3
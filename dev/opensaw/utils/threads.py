@@ -25,7 +25,6 @@ from sys import stderr
 import threading
 import cProfile
 import tempfile
-import time
 import logging
 try:
     from queue import Queue, Empty, Full
@@ -34,6 +33,34 @@ except ImportError:
     from Queue import Queue, Empty, Full
 
 
+# Queue functions
+
+def get_until_stopped(queue, is_stopped):
+    """
+    Removes and returns an item from the `queue.Queue` `queue`, waiting
+    until one is put. Returns `None` once `is_stopped()` is true, the
+    waiting thread is woken by `wake`. Uses the same implementation
+    details of `queue.Queue` as its own `get`.
+    """
+    with queue.not_empty:
+        while not queue._qsize():
+            if is_stopped():
+                return None
+            queue.not_empty.wait()
+        item = queue._get()
+        queue.not_full.notify()
+        return item
+
+
+def wake(queue):
+    """
+    Wakes the threads waiting in `get_until_stopped` on `queue`,
+    so that they check whether they have been stopped.
+    """
+    with queue.not_empty:
+        queue.not_empty.notify_all()
+
+
 # Thread classes
 
 class StoppableThread(threading.Thread):
@@ -51,12 +78,22 @@ class StoppableThread(threading.Thread):
         threading.Thread.__init__(self, group, target, name, args, kwargs)
         self.daemon = True
         self.__stopEvent = threading.Event()
+        self.__stopCallbacks = []
 
     def stop(self):
         """
-        Stop thread.
+        Stop thread, and call the callbacks added by `add_stop_callback`.
         """
         self.__stopEvent.set()
+        for fn in self.__stopCallbacks:
+            fn()
+
+    def add_stop_callback(self, fn):
+        """
+        Calls `fn` when the thread is stopped, e.g. to wake
+        the thread if it is waiting for something else.
+        """
+        self.__stopCallbacks.append(fn)
 
     def is_stopped(self):
         """
@@ -72,7 +109,8 @@ class WorkThread(StoppableThread):
     Work thread subclass. The work thread has access to input and output
     work item queues. The work thread prevents access to the input queue
     whenever stopped. The work thread prevents blocking access to the
-    work item queues and exceptions.
+    output work item queue and exceptions. A blocking `get` is woken
+    when the thread is stopped.
 
     @ivar __inQueue: the input work item queue
     @type __inQueue: (FIFO) `queue.Queue`
@@ -87,13 +125,28 @@ class WorkThread(StoppableThread):
         self.__inQueue = in_queue
         self.__outQueue = out_queue
 
-    def get(self):
+    def stop(self):
+        """
+        Stop thread, and wake it if it is waiting for a work item.
+        """
+        StoppableThread.stop(self)
+        if hasattr(self.__inQueue, "wake"):
+            self.__inQueue.wake()
+        else:
+            wake(self.__inQueue)
+
+    def get(self, block=False):
         """
         Get a work item from the input queue if any and the thread has
-        not been stopped, None otherwise.
+        not been stopped, None otherwise. With `block` the thread waits
+        until there is a work item, or until it is stopped.
         """
         if self.is_stopped():
             return None
+        if block:
+            if hasattr(self.__inQueue, "get_until_stopped"):
+                return self.__inQueue.get_until_stopped(self.is_stopped)
+            return get_until_stopped(self.__inQueue, self.is_stopped)
         try:
             return self.__inQueue.get_nowait()
         except Empty:
@@ -137,9 +190,8 @@ class ThreadPool(Queue):
             pr.enable()
 
         while not thread.is_stopped():
-            args = thread.get()
+            args = thread.get(block=True)
             if args is None:
-                time.sleep(1)
                 continue
             # args is a tuple, but func expects arguments, use *args
             func(*args)
@@ -165,12 +217,132 @@ class ThreadPool(Queue):
             return self.unfinished_tasks is 0
 
 
+class Credits(object):
+    """
+    Credit based flow control between two stages of the pipeline.
+    A producer takes a credit before it takes a job producing work for
+    the next stage, and the credit is returned when the next stage takes
+    the work, so at most `capacity` jobs are in flight. A `capacity` of
+    0 is no limit. Producers waiting for a credit wait on their own
+    queue, see `DiscardablePriorityQueue.get_scheduled`, which is woken
+    by `on_release`.
+    """
+    # Called after a credit is returned.
+    on_release = None
+
+    def __init__(self, capacity=0, used=0):
+        self.capacity = capacity
+        self.used = used
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        """
+        Takes a credit if one is available, and returns whether it did.
+        """
+        with self.lock:
+            if self.capacity and self.used >= self.capacity:
+                return False
+            self.used += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.used = max(0, self.used - 1)
+        if self.on_release is not None:
+            self.on_release()
+
+
+class BatchHandle(object):
+    """
+    The handle of a queue of a `MultiThreadPool`, returned by `addQueue`.
+    Counts the items added to the queue that have not been processed.
+    Once `close` has been called no more items are added, and the batch
+    is done as soon as the count reaches zero.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.event = threading.Event()
+        # Set when the batch is done or stopped.
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = []
+        self.pending = 0
+        self.closed = False
+        self.finished = False
+
+    def add(self):
+        with self.lock:
+            self.pending += 1
+
+    def task_done(self):
+        with self.lock:
+            self.pending -= 1
+        self.__finish()
+
+    def close(self):
+        """
+        Marks that all items have been added.
+        """
+        with self.lock:
+            self.closed = True
+        self.__finish()
+
+    def done(self):
+        return self.event.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Waits until the batch is done or stopped, or for at most
+        `timeout` seconds. Returns `True` if the batch is done.
+        """
+        self.wakeup.wait(timeout)
+        return self.event.is_set()
+
+    def stop(self):
+        """
+        Wakes the threads waiting for the batch, which will not be done
+        since the threads of its pool are stopped.
+        """
+        self.wakeup.set()
+
+    def add_done_callback(self, fn):
+        """
+        Calls `fn` with the handle when the batch is done,
+        immediately if it already is.
+        """
+        with self.lock:
+            if not self.finished:
+                self.callbacks.append(fn)
+                return
+        fn(self)
+
+    def __finish(self):
+        with self.lock:
+            if self.finished or not self.closed or self.pending > 0:
+                return
+            self.finished = True
+            callbacks, self.callbacks = self.callbacks, []
+        # The callbacks have run when `wait` returns.
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception:
+                logging.exception("Callback of batch %s failed" % self.name)
+        self.event.set()
+        self.wakeup.set()
+
+
 class MultiThreadPool():
     def __init__(self, name, threads=-1, profile=False):
         self.queues = {}
         self.funcs = {}
+        self.batches = {}
         self.lock = threading.Lock()
+        # Notified when an item is added to any of the queues.
+        self.not_empty = threading.Condition(self.lock)
         self.name = name
+        self.stopped = False
         self.__threads = []
         self.keys = []
 
@@ -181,34 +353,71 @@ class MultiThreadPool():
 
     def get_nowait(self):
         with self.lock:
-            if len(self.keys) == 0:
-                self.keys = self.queues.keys()
-            while (len(self.keys) != 0):
-                k = self.keys.pop()
-                if k not in self.queues:
-                    continue
-                q = self.queues[k]
-                f = self.funcs[k]
-                try:
-                    v = q.get_nowait()
-                except Empty:
-                    continue
-                #IPython.embed()
-                return (v,f,k)
-            raise Empty()
+            data = self.__next()
+            if data is None:
+                raise Empty()
+            return data
+
+    def get_until_stopped(self, is_stopped):
+        """
+        Same as `get_nowait`, but waits until an item is added to any
+        of the queues. Returns `None` once `is_stopped()` is true.
+        """
+        with self.not_empty:
+            while not is_stopped():
+                data = self.__next()
+                if data is not None:
+                    return data
+                self.not_empty.wait()
+            return None
+
+    def wake(self):
+        with self.not_empty:
+            self.not_empty.notify_all()
+
+    def __next(self):
+        """
+        Returns an item of the next queue having any, the lock must be held.
+        """
+        if len(self.keys) == 0:
+            self.keys = self.queues.keys()
+        while (len(self.keys) != 0):
+            k = self.keys.pop()
+            if k not in self.queues:
+                continue
+            q = self.queues[k]
+            f = self.funcs[k]
+            try:
+                v = q.get_nowait()
+            except Empty:
+                continue
+            #IPython.embed()
+            return (v,f,k)
+        return None
 
     def put_nowait(self):
         raise Exception("Not implemented!")
 
     def addQueue(self,name, function, size = 0):
+        """
+        Adds a queue of items processed by `function`,
+        and returns its `BatchHandle`.
+        """
         if name in self.queues:
             raise Exception("Queue with name already exists!")
         with self.lock:
             self.queues[name] = Queue(size)
             self.funcs[name] = function
+            self.batches[name] = BatchHandle(name)
+            if self.stopped:
+                self.batches[name].stop()
+            return self.batches[name]
 
     def addToQueue(self, name, args):
+        self.batches[name].add()
         self.queues[name].put(args)
+        with self.not_empty:
+            self.not_empty.notify()
 
     def queueDone(self, name):
         return self.queues[name].unfinished_tasks == 0
@@ -220,6 +429,7 @@ class MultiThreadPool():
         with self.lock:
             del self.queues[name]
             del self.funcs[name]
+            del self.batches[name]
 
 
     def taskDone(self, name):
@@ -229,7 +439,10 @@ class MultiThreadPool():
                 return False
 
             self.queues[name].task_done()
-            return True
+            batch = self.batches[name]
+        # The callbacks of the batch may use the pool.
+        batch.task_done()
+        return True
 
     @staticmethod
     def worker(hackish_queue, profile=False):
@@ -239,18 +452,21 @@ class MultiThreadPool():
             pr.enable()
 
         while not thread.is_stopped():
-            data = thread.get()
+            data = thread.get(block=True)
             if data is None:
-                time.sleep(1)
                 continue
 
             args, func, name = data
             #IPython.embed()
             # args is a tuple, but func expects arguments, use *args
-            func(*args)
-
-            # Bypasses the thread.task_done to add argument name.
-            hackish_queue.taskDone(name)
+            try:
+                func(*args)
+            except Exception:
+                logging.exception("Task of queue %s failed" % name)
+            finally:
+                # Bypasses the thread.task_done to add argument name.
+                # Done even if the task failed, so its batch is done.
+                hackish_queue.taskDone(name)
 
         if profile:
             pr.disable()
@@ -260,8 +476,16 @@ class MultiThreadPool():
             pr.dump_stats(name)
 
     def stop(self):
+        """
+        Stops the threads, and wakes the threads waiting for a batch.
+        """
         for t in self.__threads:
             t.stop()
+        with self.lock:
+            self.stopped = True
+            batches = list(self.batches.values())
+        for batch in batches:
+            batch.stop()
 
     def joinThreads(self):
         for t in self.__threads:
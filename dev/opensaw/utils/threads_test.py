@@ -15,13 +15,15 @@
     with this program; if not, write to the Free Software Foundation, Inc.,
     51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
+import threading
+
 try:
     from queue import PriorityQueue as Q
 except ImportError:
     # noinspection PyUnresolvedReferences
     from Queue import PriorityQueue as Q
 
-from opensaw.utils.threads import StoppableThread, WorkThread
+from opensaw.utils.threads import BatchHandle, Credits, MultiThreadPool, StoppableThread, WorkThread
 
 
 def test_StoppableThread():
@@ -65,3 +67,114 @@ def test_WorkThread():
     # Full
     wt = WorkThread(in_q, out_q, out_full)
     wt.run()
+
+
+def test_WorkThread_blocking_get():
+    in_q, out_q = Q(), Q()
+    got = []
+
+    def get_all():
+        while not wt.is_stopped():
+            item = wt.get(block=True)
+            got.append(item)
+            if item is not None:
+                wt.task_done()
+                assert wt.put(item)
+
+    wt = WorkThread(in_q, out_q, get_all)
+    wt.start()
+
+    in_q.put(1)
+    assert out_q.get(timeout=5) == 1
+
+    # A thread waiting for an item is woken when stopped.
+    wt.stop()
+    wt.join(5)
+    assert not wt.is_alive()
+    assert got == [1, None]
+
+
+def test_MultiThreadPool():
+    pool = MultiThreadPool("test-pool", 2)
+    results = []
+
+    batch = pool.addQueue("q", results.append)
+    # The pool can be used by the callbacks.
+    batch.add_done_callback(lambda b: pool.delQueue(b.name))
+
+    for i in range(10):
+        pool.addToQueue("q", (i,))
+    batch.close()
+
+    assert batch.wait(5)
+    assert sorted(results) == list(range(10))
+    assert "q" not in pool.queues
+
+    pool.stop()
+    pool.joinThreads()
+
+
+def test_MultiThreadPool_failures_and_stop():
+    pool = MultiThreadPool("test-pool", 1)
+
+    # A failed task still counts as done.
+    batch = pool.addQueue("failing", lambda: 1 / 0)
+    pool.addToQueue("failing", ())
+    batch.close()
+    assert batch.wait(5)
+
+    # A waiting thread returns when the pool is stopped.
+    hang = threading.Event()
+    batch = pool.addQueue("hanging", hang.wait)
+    pool.addToQueue("hanging", ())
+    batch.close()
+    waiter = StoppableThread(target=batch.wait)
+    waiter.start()
+    pool.stop()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert not batch.done()
+
+    # Batches added after the pool is stopped are not waited for.
+    assert not pool.addQueue("late", hang.wait).wait()
+
+    hang.set()
+    pool.joinThreads()
+
+
+def test_BatchHandle():
+    batch = BatchHandle("batch")
+    called = []
+    batch.add_done_callback(called.append)
+
+    batch.add()
+    batch.task_done()
+    # Not done before it is closed.
+    assert not batch.done()
+
+    batch.add()
+    batch.close()
+    assert not batch.wait(0)
+
+    batch.task_done()
+    assert batch.wait(0)
+    assert called == [batch]
+
+    # Called at once when already done.
+    batch.add_done_callback(called.append)
+    assert called == [batch, batch]
+
+
+def test_Credits():
+    credits = Credits(1)
+    assert credits.try_acquire()
+    assert not credits.try_acquire()
+
+    released = []
+    credits.on_release = lambda: released.append(True)
+    credits.release()
+    assert released == [True]
+    assert credits.try_acquire()
+
+    # No limit.
+    assert all(Credits(0).try_acquire() for _ in range(10))
@@ -0,0 +1,129 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+A content addressed store of the inputs generated by OpenSAW.
+
+Inputs are keyed by the SHA-1 digest of their contents, and their
+files are named by it, see `file_name`. An input generated again is
+recognized by its digest and not written again.
+
+The digests are appended to an index file in the working directory,
+so the store is kept when resuming with `--resume`. The file of an
+input is written before its digest is appended, so every digest in
+the index has its file, even after a crash.
+"""
+import hashlib
+import os
+import threading
+
+# The index file in the working directory.
+INDEX = "inputs.idx"
+
+# The number of hex digits of a digest.
+DIGEST_LENGTH = 40
+
+# The name of the file of an input, given its digest.
+file_name = "generated-{}.in".format
+
+
+def digest(data):
+    """
+    Returns the hex SHA-1 digest of the contents of an input.
+
+        >>> digest(b"bad!")
+        '645e81b374a5e2063f6073bb9cbf1ddbc500fc9e'
+    """
+    return hashlib.sha1(data).hexdigest()
+
+
+class InputStore(object):
+    """
+    InputStore
+    ==========
+
+    The digests of all inputs, shared by all threads.
+
+    #### Parameters
+        index_path : str or None
+            The file the digests are appended to, one per line.
+            With `None` the digests are only kept in memory.
+        load : bool [default=True]
+            Whether to load the digests already in the index,
+            otherwise the index is emptied.
+    """
+
+    def __init__(self, index_path=None, load=True):
+        self.index_path = index_path
+        self.digests = set()
+        self.lock = threading.Lock()
+
+        if index_path is None or not os.path.exists(index_path):
+            return
+
+        if not load:
+            open(index_path, "w").close()
+            return
+
+        with open(index_path, "r") as index:
+            for line in index:
+                line = line.strip()
+                # The last line may have been cut short by a crash.
+                if len(line) == DIGEST_LENGTH:
+                    self.digests.add(line)
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, data):
+        return digest(data) in self.digests
+
+    def add(self, data, directory=None):
+        """
+        Adds the input with the contents `data`, and writes it to its
+        file in `directory`, unless `directory` is `None`. Returns the
+        digest of the input, or `None` if an input with the same
+        contents was added before.
+        """
+        key = digest(data)
+        with self.lock:
+            if key in self.digests:
+                return None
+            self.digests.add(key)
+
+        try:
+            if directory is not None:
+                with open(os.path.join(directory, file_name(key)), "wb") as f:
+                    f.write(data)
+            if self.index_path is not None:
+                self.append(key)
+        except (IOError, OSError):
+            with self.lock:
+                self.digests.discard(key)
+            raise
+        return key
+
+    def append(self, key):
+        """
+        Appends `key` to the index as a single write of a whole line,
+        so lines of concurrent threads are never interleaved.
+        """
+        fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, key + "\n")
+        finally:
+            os.close(fd)
@@ -0,0 +1,70 @@
+"""
+    Open Security Analysis Workbench (OpenSAW) - A concolic security test tool
+    Copyright (C) 2016 Ericsson AB
+
+    This program is free software; you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation; version 2 of the License.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License along
+    with this program; if not, write to the Free Software Foundation, Inc.,
+    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+"""
+## Testing `opensaw.working.inputs`
+
+"""
+import pytest
+
+from opensaw.working.inputs import InputStore, digest, file_name
+
+
+def test_input_store():
+    store = InputStore()
+
+    assert store.add(b"bad!")
+    assert not store.add(b"bad!")
+    assert store.add(b"good")
+    assert b"bad!" in store
+    assert len(store) == 2
+
+
+def test_input_store_index(tmpdir):
+    index = tmpdir.join("inputs.idx")
+
+    store = InputStore(index.strpath)
+    assert store.add(b"bad!")
+    assert store.add(b"good")
+
+    assert index.read() == digest(b"bad!") + "\n" + digest(b"good") + "\n"
+
+    # A digest cut short by a crash is ignored.
+    index.write("645e81b3", mode="a")
+
+    resumed = InputStore(index.strpath)
+    assert len(resumed) == 2
+    assert not resumed.add(b"bad!")
+
+    fresh = InputStore(index.strpath, load=False)
+    assert len(fresh) == 0
+    assert fresh.add(b"bad!")
+
+
+def test_input_store_files(tmpdir):
+    store = InputStore(tmpdir.join("inputs.idx").strpath)
+
+    key = store.add(b"bad!", tmpdir.strpath)
+    assert key == digest(b"bad!")
+    assert tmpdir.join(file_name(key)).read_binary() == b"bad!"
+    assert store.add(b"bad!", tmpdir.strpath) is None
+
+    # An input whose file cannot be written is not indexed.
+    with pytest.raises(IOError):
+        store.add(b"good", tmpdir.join("missing").strpath)
+    assert b"good" not in store
+    assert tmpdir.join("inputs.idx").read() == key + "\n"
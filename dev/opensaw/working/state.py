@@ -21,6 +21,7 @@ import json
 import logging
 import pickle
 from os.path import basename
+from time import time
 
 try:
     import queue
@@ -31,6 +32,8 @@ except ImportError:
 from opensaw import tracegraph, statistics
 from opensaw.utils.jobs import InputJob, TraceJob
 from opensaw.utils.json import from_builtin
+from opensaw.utils.threads import Credits, wake
+from opensaw.working.inputs import INDEX, InputStore
 import threading
 
 class State(object):
@@ -40,7 +43,7 @@ class State(object):
     """
 
     def __init__(self, directory, manifest, queue_size, trace_queue, in_queue,
-                 tracegraph, input_db, path_condition_db, statistics=None):
+                 tracegraph, inputs, path_condition_db, statistics=None):
         self.dir = directory
         self.manifest = manifest
         self.queue_size = queue_size
@@ -48,10 +51,20 @@ class State(object):
         self.trace_queue = trace_queue
         self.in_queue = in_queue
         self.tracegraph = tracegraph
-        self.input_db = input_db
-        self.input_db_lock = threading.RLock()
+        self.inputs = inputs
         self.path_condition_db = path_condition_db
         self.statistics = statistics
+        # Set when all tasks are done, or the run is forced to be done.
+        self.done = threading.Event()
+        self.trace_queue.on_drained = self.check_done
+        self.in_queue.on_drained = self.check_done
+        # The queues may have no unfinished tasks to begin with.
+        self.check_done()
+        # Credits for the traces in the trace queue, see `pin.Worker.run`.
+        # Traces restored by `load` hold a credit each. Unlimited until set by `configure`.
+        self.trace_credits = Credits(0, self.trace_queue.qsize())
+        # Tracers waiting for a credit wait on the input queue.
+        self.trace_credits.on_release = lambda: wake(self.in_queue)
 
     def queues_empty(self):
         """Returns True if both in_queue and trace_queue are empty"""
@@ -59,6 +72,7 @@ class State(object):
 
     def force_done(self):
         self.forced_done = True
+        self.done.set()
 
     def is_done(self):
         if self.forced_done:
@@ -71,6 +85,22 @@ class State(object):
             return (self.trace_queue.unfinished_tasks is 0 and
                     self.in_queue.unfinished_tasks is 0)
 
+    def check_done(self):
+        """
+        Sets the `done` event if all tasks are done. Called by the
+        queues whenever their last unfinished task is done.
+        """
+        if self.is_done():
+            self.done.set()
+
+    def wait_done(self, timeout=None):
+        """
+        Waits until all tasks are done in both queues, or the run is
+        forced to be done, for at most `timeout` seconds. Returns `True`
+        if the run is done.
+        """
+        return self.done.wait(timeout)
+
     def log(self):
         """
         Writes the current state to logs.
@@ -91,12 +121,11 @@ class State(object):
     def get_picklable_state(self):
         return {
             "QueueSize": self.queue_size,
-            "InputQueue": self.in_queue.queue,
-            "TraceQueue": self.trace_queue.queue,
+            "InputQueue": list(self.in_queue.queue),
+            "TraceQueue": list(self.trace_queue.queue),
             "InputCount": InputJob.COUNT,
             "TraceCount": TraceJob.COUNT,
             "tracegraph": self.tracegraph,
-            "InputDB": self.input_db,
             "PathCondDB": self.path_condition_db,
             "Statistics": self.statistics
         }
@@ -123,8 +152,10 @@ class State(object):
         trace_queue = DiscardablePriorityQueue(options.queueSize)
         in_queue = DiscardablePriorityQueue(options.queueSize)
 
+        # A new run starts with an empty store.
+        inputs = InputStore(directory.local_path_for_file(INDEX), load=False)
+
         # Copy initial inputs to working directory.
-        input_db = set()
         for initial in options.initialInput:
             directory.copy_file_here(initial)
             # Strip down to the basename. Everything should be relative
@@ -134,11 +165,11 @@ class State(object):
 
             in_queue.put(InputJob.make_initial(initial_file_name))
 
-            with open(initial_file_name, "r") as file:
-                input_db.add(hash(file.read()))
+            with open(initial_file_name, "rb") as file:
+                inputs.add(file.read())
 
         return State(directory, options.manifest, options.queueSize, trace_queue,
-                     in_queue, tracegraph.Graph(), input_db, set(),
+                     in_queue, tracegraph.Graph(), inputs, set(),
                      statistics.Aggregate())
 
     @staticmethod
@@ -157,22 +188,254 @@ class State(object):
         queue_size = state["QueueSize"]
 
         trace_queue = DiscardablePriorityQueue(queue_size)
-        trace_queue.queue = state["TraceQueue"]
+        trace_queue.restore(state["TraceQueue"])
 
         input_queue = DiscardablePriorityQueue(queue_size)
-        input_queue.queue = state["InputQueue"]
+        input_queue.restore(state["InputQueue"])
 
         return State(directory, manifest,
                      queue_size, trace_queue, input_queue,
-                     state["tracegraph"], state["InputDB"], state["PathCondDB"],
+                     state["tracegraph"], InputStore(directory.local_path_for_file(INDEX)),
+                     state["PathCondDB"],
                      state["Statistics"])
 
-# Ugly implementation assuming implementation details of PriorityQueue
+class MinMaxHeap(object):
+    """
+    A double-ended priority queue. Items on even levels of the heap are
+    smaller than their descendants, and items on odd levels larger, so
+    both the smallest and the largest item are found in constant time,
+    and removed in `O(log n)`. The position of every item is kept, so
+    that any item can be removed, e.g. when its priority has changed.
+    Items are identified by identity, not by equality, so the same
+    object can only be in the heap once.
+
+        >>> heap = MinMaxHeap([5, 1, 9, 3, 7])
+        >>> heap.pop_min(), heap.pop_max(), len(heap)
+        (1, 9, 3)
+    """
+
+    def __init__(self, items=()):
+        self.items = []
+        self.positions = {}
+        for item in items:
+            self.push(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, item):
+        return id(item) in self.positions
+
+    def push(self, item):
+        self.items.append(item)
+        self.positions[id(item)] = len(self.items) - 1
+        self.__bubble_up(len(self.items) - 1)
+
+    def min(self):
+        return self.items[0]
+
+    def pop_min(self):
+        return self.__remove(0)
+
+    def pop_max(self):
+        return self.__remove(self.__max_index())
+
+    def remove(self, item):
+        """
+        Removes `item`. Raises `KeyError` if it is not in the heap.
+        """
+        return self.__remove(self.positions[id(item)])
+
+    def __max_index(self):
+        if len(self.items) < 3:
+            return len(self.items) - 1
+        return 2 if self.items[1] < self.items[2] else 1
+
+    def __remove(self, i):
+        item = self.items[i]
+        last = self.items.pop()
+        del self.positions[id(item)]
+        if i < len(self.items):
+            self.__set(i, last)
+            self.__trickle_down(i)
+            self.__bubble_up(self.positions[id(last)])
+        return item
+
+    def __set(self, i, item):
+        self.items[i] = item
+        self.positions[id(item)] = i
+
+    def __swap(self, i, j):
+        a, b = self.items[i], self.items[j]
+        self.__set(i, b)
+        self.__set(j, a)
+
+    @staticmethod
+    def __on_min_level(i):
+        return (i + 1).bit_length() % 2 == 1
+
+    @staticmethod
+    def __smaller(a, b):
+        return a < b
+
+    @staticmethod
+    def __larger(a, b):
+        return b < a
+
+    def __bubble_up(self, i):
+        if i == 0:
+            return
+        parent = (i - 1) // 2
+        if self.__on_min_level(i):
+            if self.items[parent] < self.items[i]:
+                self.__swap(i, parent)
+                self.__bubble_up_levels(parent, self.__larger)
+            else:
+                self.__bubble_up_levels(i, self.__smaller)
+        else:
+            if self.items[i] < self.items[parent]:
+                self.__swap(i, parent)
+                self.__bubble_up_levels(parent, self.__smaller)
+            else:
+                self.__bubble_up_levels(i, self.__larger)
+
+    def __bubble_up_levels(self, i, before):
+        """
+        Moves the item at `i` up past its grandparents
+        while it should be `before` them.
+        """
+        while i > 2:
+            grandparent = ((i - 1) // 2 - 1) // 2
+            if not before(self.items[i], self.items[grandparent]):
+                return
+            self.__swap(i, grandparent)
+            i = grandparent
+
+    def __trickle_down(self, i):
+        before = self.__smaller if self.__on_min_level(i) else self.__larger
+        items = self.items
+        while 2 * i + 1 < len(items):
+            # The best of the children and grandchildren.
+            candidates = [2 * i + 1, 2 * i + 2] + list(range(4 * i + 3, 4 * i + 7))
+            m = 2 * i + 1
+            for k in candidates:
+                if k < len(items) and before(items[k], items[m]):
+                    m = k
+
+            if not before(items[m], items[i]):
+                return
+            self.__swap(m, i)
+            if m <= 2 * i + 2:
+                return
+
+            parent = (m - 1) // 2
+            if before(items[parent], items[m]):
+                self.__swap(m, parent)
+            i = m
+
+
 class DiscardablePriorityQueue(queue.PriorityQueue):
+    """
+    A priority queue of jobs, which can also discard the job with the
+    lowest priority, and change the priority of a queued job.
+    The jobs are kept in a `MinMaxHeap`.
+    """
+    # Called when the last unfinished task is done, see `State.check_done`.
+    on_drained = None
+
+    def _init(self, maxsize):
+        self.queue = MinMaxHeap()
+
+    def _qsize(self, len=len):
+        return len(self.queue)
+
+    def _put(self, item):
+        self.queue.push(item)
+
+    def _get(self):
+        return self.queue.pop_min()
+
+    def restore(self, items):
+        """
+        Queues `items`, as saved by `State.save`, before any thread uses the queue.
+        """
+        self.queue = MinMaxHeap(items)
+        self.unfinished_tasks = len(self.queue)
+
+    def task_done(self):
+        queue.PriorityQueue.task_done(self)
+        if self.on_drained is not None and self.unfinished_tasks == 0:
+            self.on_drained()
+
     def discard(self):
+        """
+        Removes and returns the job with the lowest priority.
+        It counts as done, since it is never processed.
+        """
         with self.mutex:
             if not self._qsize():
-                raise queue.Queue.Empty
-            deleted = self.queue[-1]
-            del self.queue[-1]
-            return deleted
\ No newline at end of file
+                raise queue.Empty
+            deleted = self.queue.pop_max()
+            self.not_full.notify()
+        self.task_done()
+        return deleted
+
+    def get_scheduled(self, needs_credit, take_credit, is_stopped):
+        """
+        Removes and returns the job with the highest priority, and the
+        seconds spent waiting for a credit. A job for which
+        `needs_credit(job)` is true is only taken once `take_credit()`
+        has taken a credit for it. Until then the job with the highest
+        priority needing no credit is taken, so the thread keeps doing
+        work which is not held back. Returns `(None, stalled)` once
+        `is_stopped()` is true. Waiting threads are woken by a put,
+        by `threads.wake` and by a returned credit, see `State`.
+        """
+        stalled = 0
+        with self.not_empty:
+            while not is_stopped():
+                job = self.__take(needs_credit, take_credit)
+                if job is not None:
+                    self.not_full.notify()
+                    return job, stalled
+
+                held_back = self._qsize() > 0
+                start = time()
+                self.not_empty.wait()
+                if held_back:
+                    stalled += time() - start
+        return None, stalled
+
+    def put_back(self, job):
+        """
+        Queues the `job` taken by `get_scheduled` again, even when the
+        queue is full. It is still the same unfinished task, so
+        `task_done` is not called for it.
+        """
+        with self.not_empty:
+            self._put(job)
+            self.not_empty.notify()
+
+    def __take(self, needs_credit, take_credit):
+        if not self._qsize():
+            return None
+        if not needs_credit(self.queue.min()) or take_credit():
+            return self.queue.pop_min()
+
+        free = [job for job in self.queue if not needs_credit(job)]
+        if not free:
+            return None
+        return self.queue.remove(min(free))
+
+    def reprioritize(self, job, priority):
+        """
+        Sets the priority of the queued `job`.
+        Raises `KeyError` if it is not queued.
+        """
+        with self.mutex:
+            self.queue.remove(job)
+            job.priority = priority
+            self.queue.push(job)
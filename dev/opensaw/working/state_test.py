@@ -19,7 +19,13 @@
 ## Testing `opensaw.working.state`
 
 """
+import random
+import time
+
+from opensaw.utils.jobs import FileJob
+from opensaw.utils.threads import Credits, StoppableThread, wake
 from opensaw.working import Directory, State
+from opensaw.working.state import DiscardablePriorityQueue, MinMaxHeap
 
 class Options(object):
     initialInput = ["something"]
@@ -42,6 +48,7 @@ def test_State(tmpdir):
 
     assert not state.queues_empty()
     assert not state.is_done()
+    assert not state.wait_done(0)
 
     state.in_queue.get()
 
@@ -52,6 +59,7 @@ def test_State(tmpdir):
 
     assert state.queues_empty()
     assert state.is_done()
+    assert state.wait_done(0)
 
     state.save()
 
@@ -62,9 +70,103 @@ def test_State(tmpdir):
     assert state.manifest == state2.manifest
     assert state.queue_size == state2.queue_size
     assert state.tracegraph.size() == state2.tracegraph.size()
+    assert not state2.inputs.add(b"contents")
 
     assert (type(state.statistics.coverage.sem) ==
             type(state2.statistics.coverage.sem))
 
     # Log all work to files.
     state2.log()
+
+
+def test_State_force_done(tmpdir):
+    tmpdir.chdir()
+    tmpdir.join(Options.initialInput[0]).write("contents")
+
+    state = State.from_options(Directory(tmpdir.mkdir("target").strpath), Options)
+    assert not state.wait_done(0)
+
+    state.force_done()
+    assert state.wait_done(0)
+
+
+def test_MinMaxHeap():
+    rng = random.Random(7)
+    for _ in range(50):
+        # Items are identified by identity, so equal values are separate lists.
+        values = [[rng.randint(0, 20)] for _ in range(rng.randint(1, 40))]
+        heap = MinMaxHeap(values)
+        expected = sorted(values)
+
+        while expected:
+            if rng.random() < 0.5:
+                assert heap.pop_min() == expected.pop(0)
+            else:
+                assert heap.pop_max() == expected.pop()
+        assert len(heap) == 0
+
+
+def test_MinMaxHeap_remove():
+    rng = random.Random(11)
+    items = [[rng.randint(0, 100)] for _ in range(30)]
+    heap = MinMaxHeap(items)
+
+    # Items are changed in place, and moved by removing and pushing them.
+    for item in rng.sample(items, 10):
+        heap.remove(item)
+        item[0] = rng.randint(0, 100)
+        heap.push(item)
+
+    assert [heap.pop_min() for _ in items] == sorted(items)
+
+
+def test_DiscardablePriorityQueue():
+    q = DiscardablePriorityQueue()
+    jobs = [FileJob("job-%d" % priority, priority) for priority in [3, 1, 4, 2]]
+    for job in jobs:
+        q.put(job)
+
+    # The job with the lowest priority is discarded, and counts as done.
+    assert q.discard().priority == 1
+    assert q.unfinished_tasks == 3
+
+    q.reprioritize(jobs[3], 5)
+    assert [q.get().priority for _ in range(3)] == [5, 4, 3]
+
+
+def test_DiscardablePriorityQueue_get_scheduled():
+    q = DiscardablePriorityQueue()
+    credits = Credits(1)
+    credits.on_release = lambda: wake(q)
+    jobs = [FileJob("job-%d" % priority, priority) for priority in [3, 1, 4, 2]]
+    for job in jobs:
+        q.put(job)
+    # Odd priorities need a credit.
+    needs_credit = lambda job: job.priority % 2 == 1
+    never_stopped = lambda: False
+
+    assert q.get_scheduled(needs_credit, credits.try_acquire, never_stopped)[0].priority == 4
+    assert q.get_scheduled(needs_credit, credits.try_acquire, never_stopped)[0].priority == 3
+    # Without a credit, the jobs needing none are taken first.
+    assert q.get_scheduled(needs_credit, credits.try_acquire, never_stopped)[0].priority == 2
+
+    taken = []
+    st = StoppableThread(target=lambda: taken.append(q.get_scheduled(needs_credit, credits.try_acquire, st.is_stopped)))
+    st.start()
+    time.sleep(0.1)
+    # A returned credit wakes the waiting thread.
+    credits.release()
+    st.join(5)
+    job, stalled = taken[0]
+    assert job.priority == 1
+    assert stalled > 0
+
+    # A waiting thread gives up when stopped.
+    q.put_back(job)
+    st = StoppableThread(target=lambda: taken.append(q.get_scheduled(needs_credit, credits.try_acquire, st.is_stopped)))
+    st.add_stop_callback(lambda: wake(q))
+    st.start()
+    st.stop()
+    st.join(5)
+    assert taken[1][0] is None
+    assert q.qsize() == 1
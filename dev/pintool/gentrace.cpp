@@ -164,6 +164,11 @@ KNOB<string> KnobBBLOut(KNOB_MODE_WRITEONCE, "pintool",
                         "b", "visited_blocks.cov",
                         "A CSV-file with found blocks on the first line, and visited on the second.");
 
+KNOB<string> KnobBBLFormat(KNOB_MODE_WRITEONCE, "pintool",
+                           "coverage-format", "text",
+                           "Format of the coverage file: 'text' for comma separated address:visit entries, "
+                           "'binary' for little-endian uint32 address and visit pairs.");
+
 KNOB<int> KnobTrigAddr(KNOB_MODE_WRITEONCE, "pintool",
                        "trig_addr", "",
                        "Address of trigger point. No logging will occur until execution reaches this address.");
@@ -195,6 +200,11 @@ KNOB<bool> KnobTaintTracking(KNOB_MODE_WRITEONCE, "pintool",
                              "taint-track", "true",
                              "Enable taint tracking");
 
+KNOB<string> KnobSpecialsOut(KNOB_MODE_WRITEONCE, "pintool",
+                             "specials", "",
+                             "A file to write the loaded modules and fatal signals to, as the special statements "
+                             "iltrans lifts them to. Lets coverage runs without taint tracking skip iltrans.");
+
 KNOB<bool> LogAllAfterTaint(KNOB_MODE_WRITEONCE, "pintool",
                             "logall-after", "false",
                             "Log all (even untainted) instructions after the first tainted instruction");
@@ -405,8 +415,11 @@ int g_counter = 0;
 //TraceWriter *g_tw;
 TraceContainerWriter *g_twnew;
 
-// A taint tracker
-TaintTracker * tracker;
+// A taint tracker, NULL unless taint tracking is enabled
+TaintTracker * tracker = NULL;
+
+// The file given by -specials, if any
+ofstream specials;
 
 FrameBuf g_buffer[BUFFER_SIZE];
 uint32_t g_bufidx;
@@ -824,7 +837,8 @@ uint32_t AcceptWrapper(CONTEXT *ctx, AFUNPTR fp, THREADID tid, uint32_t s, void
                                 PIN_PARG_END());
 
     PIN_GetLock(&lock, tid+1);
-    tracker->acceptHelper(ret);
+    if (tracker)
+        tracker->acceptHelper(ret);
     PIN_ReleaseLock(&lock);
 
     return ret;
@@ -854,7 +868,8 @@ uint32_t WSAConnectWrapper(CONTEXT *ctx, AFUNPTR fp, THREADID tid, uint32_t s, v
 
     PIN_GetLock(&lock, tid+1);
     if (ret != SOCKET_ERROR) {
-        tracker->acceptHelper(s);
+        if (tracker)
+            tracker->acceptHelper(s);
     } else {
         cerr << "WSAConnect error " << ret << endl;
     }
@@ -886,7 +901,8 @@ uint32_t ConnectWrapper(CONTEXT *ctx, AFUNPTR fp, THREADID tid, uint32_t s, void
     // Non-blocking sockets will return an "error".  However, we can't
     // call GetLastError to find out what the root problem is,
     // so... we'll just assume the connection was successful.
-    tracker->acceptHelper(s);
+    if (tracker)
+        tracker->acceptHelper(s);
 
     // } else {
     //    cerr << "connect error " << ret << endl;
@@ -935,7 +951,7 @@ void AfterRecv(THREADID tid, int ret, char *f) {
         RecvInfo_t ri = ti->recvStack.top();
         ti->recvStack.pop();
 
-        if (ret != SOCKET_ERROR) {
+        if (ret != SOCKET_ERROR && tracker) {
             PIN_GetLock(&lock, tid+1);
             //cerr << "fd: " << ri.fd << endl;
 
@@ -991,8 +1007,10 @@ void* GetEnvWWrap(CONTEXT *ctx, AFUNPTR fp, THREADID tid) {
     PIN_GetLock(&lock, tid+1);
     LLOG("Got callback lock\n");
 
-    std::vector<frame> frms = tracker->taintEnv(NULL, (wchar_t*) ret);
-    g_twnew->add<std::vector<frame> > (frms);
+    if (tracker) {
+        std::vector<frame> frms = tracker->taintEnv(NULL, (wchar_t*) ret);
+        g_twnew->add<std::vector<frame> > (frms);
+    }
 
     PIN_ReleaseLock(&lock);
     LLOG("Releasing callback lock\n");
@@ -1027,8 +1045,10 @@ void* GetEnvAWrap(CONTEXT *ctx, AFUNPTR fp, THREADID tid) {
     PIN_GetLock(&lock, tid+1);
     LLOG("Got callback lock\n");
 
-    std::vector<frame> frms = tracker->taintEnv((char*) ret, NULL);
-    g_twnew->add<std::vector<frame> > (frms);
+    if (tracker) {
+        std::vector<frame> frms = tracker->taintEnv((char*) ret, NULL);
+        g_twnew->add<std::vector<frame> > (frms);
+    }
 
     PIN_ReleaseLock(&lock);
     LLOG("Releasing callback lock\n");
@@ -1083,6 +1103,13 @@ VOID AppendBuffer(ADDRINT addr,
 
     //LOG("APPEND: " + hexstr(addr) + "\n");
 
+    /* Nothing is logged without taint tracking, e.g. when only the
+       coverage is recorded. */
+    if (!tracker) {
+        va_end(va);
+        return;
+    }
+
     /* BUILD_VAL touches values, so we need the lock early. */
 
     /* Periodically report eip. */
@@ -1918,7 +1945,7 @@ VOID ThreadStart(THREADID threadid, CONTEXT *ctx, INT32 flags, VOID *v)
     LOG("New thread starting\n");
     cerr << "Thread " << threadid << " starting" << endl;
 
-    if (firstthread) {
+    if (firstthread && tracker) {
         firstthread = false;
 #ifndef _WIN32 /* unix */
         int argc = *(int*)(PIN_GetContextReg(ctx, REG_ESP));
@@ -1965,6 +1992,11 @@ VOID ModLoad(IMG img, VOID *v)
 
     g_twnew->add(f);
 
+    if (specials.is_open()) {
+        specials << "special \"Loaded module '" << name << "' from " << hexstr(IMG_LowAddress(img))
+                 << " to " << hexstr(IMG_HighAddress(img)) << "\"" << endl;
+    }
+
 #ifdef _WIN32
     // Try to find kernel32
     {
@@ -2346,7 +2378,7 @@ VOID SyscallEntry(THREADID tid, CONTEXT *ctx, SYSCALL_STANDARD std, VOID *v)
         g_twnew->add(si.sf);
     }
 
-    if (tracker->taintPreSC(si.sf.mutable_syscall_frame()->number(), (const uint64_t *) (si.sf.syscall_frame().argument_list().elem().data()), si.state)) {
+    if (tracker && tracker->taintPreSC(si.sf.mutable_syscall_frame()->number(), (const uint64_t *) (si.sf.syscall_frame().argument_list().elem().data()), si.state)) {
         // Do we need to do anything here? ...
     }
 
@@ -2385,6 +2417,11 @@ VOID SyscallExit(THREADID tid, CONTEXT *ctx, SYSCALL_STANDARD std, VOID *v)
 
     // Check to see if we need to introduce tainted bytes as a result of this
     // sytem call
+    if (!tracker) {
+        PIN_ReleaseLock(&lock);
+        return;
+    }
+
     FrameOption_t fo = tracker->taintPostSC(PIN_GetSyscallReturn(ctx, std), (const uint64_t*) (si.sf.syscall_frame().argument_list().elem().data()), addr, length, si.state);
 
     if (fo.b) {
@@ -2466,6 +2503,9 @@ VOID ExceptionHandler(THREADID threadid, CONTEXT_CHANGE_REASON reason, const CON
 
     if (reason == CONTEXT_CHANGE_REASON_FATALSIGNAL) {
         std::cerr << "Received fatal signal " << info << endl;
+        if (specials.is_open()) {
+            specials << "special \"Exception number " << info << " occurred\"" << endl;
+        }
         if ((int) info == SEGV_SIGNAL) {
             LOG("SEGV\n");
             std::cerr << "Intercepted SEGV" << endl;
@@ -2482,7 +2522,7 @@ VOID ExceptionHandler(THREADID threadid, CONTEXT_CHANGE_REASON reason, const CON
         ADDRINT pc = PIN_GetContextReg(from, REG_INST_PTR);
         cerr << "Received windows exception @" << pc << " " << info << " in thread " << threadid << endl;
 
-        if (info == accessViolation && SEHMode.Value() && g_taint_introduced) {
+        if (info == accessViolation && SEHMode.Value() && g_taint_introduced && tracker) {
             cerr << "SEH mode activated!" << endl;
             ADDRINT old_esp = PIN_GetContextReg(from, REG_STACK_PTR);
             ADDRINT new_esp = PIN_GetContextReg(to, REG_STACK_PTR);
@@ -2644,7 +2684,17 @@ VOID Fini(INT32 code, VOID *v)
 VOID Cleanup()
 {
     // Write to coverage file.
-    {
+    if (KnobBBLFormat.Value() == "binary") {
+      ofstream file (KnobBBLOut.Value().c_str(), ios::out | ios::binary);
+
+      for (auto it = basic_blocks.begin(); it != basic_blocks.end(); ++it) {
+        uint32_t entry[2] = { (uint32_t) it->first, (uint32_t) it->second };
+        // Pin only runs on little-endian x86.
+        file.write((const char *) entry, sizeof(entry));
+      }
+
+      file.close();
+    } else {
       ofstream file (KnobBBLOut.Value().c_str());
 
       auto begin = basic_blocks.begin();
@@ -2708,6 +2758,10 @@ int main(int argc, char *argv[])
     } else {
         g_usetrigger = false;
     }
+    if (KnobSpecialsOut.Value() != "") {
+        specials.open(KnobSpecialsOut.Value().c_str());
+    }
+
     // Check if taint tracking is on
     if (KnobTaintTracking.Value()) {
         tracker = new TaintTracker(values);